@@ -1,6 +1,7 @@
 import os
 import logging
 
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
@@ -24,9 +25,48 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
 }
+# Connections per worker. Database reads made from the async loop run on
+# DB_POOL_SIZE threads (see async_runtime.run_db), leaving the overflow to
+# request threads and the write-behind flushers.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+if not (app.config["SQLALCHEMY_DATABASE_URI"] or "").startswith("sqlite"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"].update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
 
 db.init_app(app)
 
-with app.app_context():
-    import models  # noqa: F401
+import models  # noqa: E402,F401
+
+
+@app.cli.command('init-db')
+def init_db():
+    """Create any missing database tables."""
     db.create_all()
+    logging.info("Database tables created")
+
+
+@app.cli.command('omdb-export')
+@click.argument('path')
+@click.option('--batch-size', default=1000, show_default=True)
+def omdb_export(path, batch_size):
+    """Export the OMDb cache to PATH (.jsonl.gz, or .parquet with pyarrow)."""
+    from omdb_snapshot import export_cache
+
+    click.echo(f"Exported {export_cache(path, batch_size=batch_size)} entries to {path}")
+
+
+@app.cli.command('omdb-import')
+@click.argument('path')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--overwrite-newer', is_flag=True,
+              help='Also replace entries cached more recently than the snapshot.')
+def omdb_import(path, batch_size, overwrite_newer):
+    """Load an OMDb cache snapshot written by omdb-export.
+
+    Rows keep their original cached_at; rows older than the TTL are served
+    as stale and refreshed in the background.
+    """
+    from omdb_snapshot import import_cache
+
+    count = import_cache(path, batch_size=batch_size, overwrite_newer=overwrite_newer)
+    click.echo(f"Imported {count} entries from {path}")
@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ASYNC_TIMEOUT_SECONDS = float(os.environ.get("ASYNC_TIMEOUT_SECONDS", 30))
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+_db_executor = None
+_db_executor_pid = None
+
+
+def get_loop():
+    """Return this process's background event loop, starting it on first use.
+
+    All async upstream clients live on this one loop, so a request thread
+    only blocks on its own result while the loop multiplexes every pending
+    OMDb/OpenAI call in the process. A forked worker starts a fresh loop.
+    """
+    global _loop, _loop_pid
+
+    if _loop is not None and _loop_pid == os.getpid():
+        return _loop
+
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='async-upstreams', daemon=True)
+            thread.start()
+            _loop = loop
+            _loop_pid = os.getpid()
+            logger.debug("Started async upstream event loop")
+    return _loop
+
+
+def run(coro, timeout=ASYNC_TIMEOUT_SECONDS):
+    """Run ``coro`` on the background loop and wait for its result."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+def _get_db_executor():
+    global _db_executor, _db_executor_pid
+
+    with _loop_lock:
+        if _db_executor is None or _db_executor_pid != os.getpid():
+            from app import DB_POOL_SIZE
+
+            _db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix='async-db')
+            _db_executor_pid = os.getpid()
+    return _db_executor
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking database call off the loop.
+
+    The threads are capped at the connection pool size, so reads from the
+    loop never queue inside SQLAlchemy waiting for a connection.
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_get_db_executor(), call)
+
+
+async def gather(*coros):
+    return await asyncio.gather(*coros)
@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama',
+    'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance',
+    'Science Fiction', 'TV Movie', 'Thriller', 'War', 'Western', 'Foreign'
+]
+WORDS = [
+    'night', 'star', 'dark', 'love', 'war', 'city', 'ghost', 'king', 'river', 'shadow',
+    'storm', 'heart', 'machine', 'island', 'secret', 'last', 'lost', 'blood', 'dream', 'fire'
+]
+POOL_SIZE = 512
+
+
+def _json_pool(rng, names, min_items, max_items, start_id=1):
+    pool = []
+    for _ in range(POOL_SIZE):
+        count = rng.integers(min_items, max_items + 1)
+        picked = rng.choice(len(names), size=min(count, len(names)), replace=False)
+        pool.append(json.dumps([{'id': start_id + int(i), 'name': names[i]} for i in picked]))
+    return np.array(pool, dtype=object)
+
+
+def build_catalog(rows, seed=42):
+    """Build movies, credits and links frames shaped like the TMDB/MovieLens CSVs.
+
+    Nested columns are drawn from small pools of pre-serialised JSON strings,
+    so even the 1M-row catalog is built in seconds.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+
+    keyword_names = [f"{a} {b}" for a in WORDS for b in WORDS]
+    actor_names = [f"Actor {n}" for n in range(2000)]
+    genre_pool = _json_pool(rng, GENRES, 1, 3)
+    keyword_pool = _json_pool(rng, keyword_names, 2, 8, start_id=1000)
+    cast_pool = np.array([
+        json.dumps([{'cast_id': j, 'name': actor_names[i], 'order': j}
+                    for j, i in enumerate(rng.choice(len(actor_names), size=8, replace=False))])
+        for _ in range(POOL_SIZE)
+    ], dtype=object)
+
+    words = np.array(WORDS, dtype=object)
+    titles = (pd.Series(words[rng.integers(0, len(WORDS), rows)]).str.title() + ' '
+              + pd.Series(words[rng.integers(0, len(WORDS), rows)]) + ' '
+              + pd.Series(ids).astype(str))
+    years = rng.integers(1920, 2024, rows)
+    months = rng.integers(1, 13, rows)
+
+    movies = pd.DataFrame({
+        'budget': rng.integers(0, 200_000_000, rows),
+        'genres': genre_pool[rng.integers(0, POOL_SIZE, rows)],
+        'id': ids,
+        'keywords': keyword_pool[rng.integers(0, POOL_SIZE, rows)],
+        'original_title': titles,
+        'overview': 'A synthetic movie about ' + titles.str.lower() + '.',
+        'popularity': np.round(rng.gamma(2.0, 10.0, rows), 3),
+        'release_date': pd.Series(years).astype(str) + '-' + pd.Series(months).astype(str).str.zfill(2) + '-01',
+        'runtime': rng.integers(70, 200, rows),
+        'title': titles,
+        'vote_average': np.round(np.clip(rng.normal(6.3, 1.0, rows), 0, 10), 1),
+        'vote_count': rng.integers(0, 15000, rows),
+    })
+
+    credits = pd.DataFrame({
+        'movie_id': ids,
+        'title': titles,
+        'cast': cast_pool[rng.integers(0, POOL_SIZE, rows)],
+        'crew': '[]',
+    })
+
+    links = pd.DataFrame({
+        'movieId': ids,
+        'imdbId': ids + 100000,
+        'tmdbId': ids,
+    })
+
+    return movies, credits, links
+
+
+def install_catalog(loader, rows, seed=42):
+    movies, credits, links = build_catalog(rows, seed=seed)
+    loader.load_frames(movies, credits_df=credits, links_df=links)
+    return loader
@@ -0,0 +1,178 @@
+import json
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Placeholder poster payload. It is not a decodable image, so the poster
+# proxy stores it as the original for every size.
+FAKE_POSTER = b'\xff\xd8\xff\xe0' + bytes(4096) + b'\xff\xd9'
+
+_AVAILABLE_RE = re.compile(r'Available movies[^:]*: (\[.*\])')
+
+
+class FakeUpstream:
+    """A threaded local HTTP server with configurable latency and call counts."""
+
+    def __init__(self, latency_ms=0, error_rate=0.0):
+        self.latency = latency_ms / 1000.0
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._error_counter = 0
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+            if self.error_rate <= 0:
+                return False
+            self._error_counter += 1
+            return (self._error_counter * self.error_rate) % 1 < self.error_rate
+
+    def handle(self, handler, method):
+        raise NotImplementedError
+
+    def start(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                upstream.handle(self, 'GET')
+
+            def do_POST(self):
+                upstream.handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def send(handler, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+class FakeOMDb(FakeUpstream):
+    """Answers OMDb ``i=``, ``t=`` and ``s=`` lookups and serves poster images."""
+
+    def handle(self, handler, method):
+        parsed = urlparse(handler.path)
+
+        if parsed.path.startswith('/img/'):
+            self._count('poster_image')
+            time.sleep(self.latency)
+            self.send(handler, 200, FAKE_POSTER, content_type='image/jpeg')
+            return
+
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        kind = 'search' if 's' in params else 'lookup'
+        failed = self._count(kind)
+        time.sleep(self.latency)
+
+        if failed:
+            self.send(handler, 503, {'Response': 'False', 'Error': 'Injected failure'})
+            return
+
+        if kind == 'search':
+            query = params['s']
+            results = [{
+                'Title': f"{query} {n}",
+                'Year': '2000',
+                'imdbID': f"tt{9000000 + n:07d}",
+                'Poster': f"{self.url}/img/tt{9000000 + n:07d}.jpg"
+            } for n in range(10)]
+            self.send(handler, 200, {'Response': 'True', 'Search': results})
+            return
+
+        imdb_id = params.get('i') or f"tt{zlib.crc32(params.get('t', '').encode('utf-8')) % 10000000:07d}"
+        self.send(handler, 200, {
+            'Response': 'True',
+            'Title': params.get('t') or f"Movie {imdb_id}",
+            'Year': '2000',
+            'Rated': 'PG-13',
+            'Runtime': '120 min',
+            'Genre': 'Drama',
+            'Director': 'Jane Doe',
+            'Actors': 'A. Actor, B. Actor',
+            'Plot': 'A synthetic plot.',
+            'Poster': f"{self.url}/img/{imdb_id}.jpg",
+            'imdbRating': '7.5',
+            'imdbID': imdb_id,
+            'BoxOffice': 'N/A',
+            'Awards': 'N/A'
+        })
+
+
+class FakeOpenAI(FakeUpstream):
+    """Minimal ``/v1/chat/completions`` that recommends the first movies it was offered."""
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v1"
+
+    def handle(self, handler, method):
+        length = int(handler.headers.get('Content-Length') or 0)
+        payload = json.loads(handler.rfile.read(length) or b'{}')
+        failed = self._count('chat')
+        time.sleep(self.latency)
+
+        if failed:
+            self.send(handler, 500, {'error': {'message': 'Injected failure', 'type': 'server_error'}})
+            return
+
+        prompt = payload.get('messages', [{}])[-1].get('content', '')
+        match = _AVAILABLE_RE.search(prompt)
+        titles = []
+        if match:
+            try:
+                titles = [m.get('title') for m in json.loads(match.group(1))][:12]
+            except ValueError:
+                titles = []
+
+        content = json.dumps({'recommendations': titles, 'reason': 'Synthetic recommendation'})
+        self.send(handler, 200, {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'gpt-4o-mini'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        })
@@ -0,0 +1,21 @@
+"""Gunicorn config used by benchmarks.loadtest.
+
+Each worker installs the same synthetic catalog after forking so the load
+test does not depend on the TMDB CSVs being present, then runs the normal
+warm-up so /ready reports when it can take traffic.
+"""
+import os
+
+loglevel = 'warning'
+
+
+def post_fork(server, worker):
+    import logging
+
+    from benchmarks.catalog import install_catalog
+    from movie_data import movie_loader
+    from warmup import warmup
+
+    logging.getLogger().setLevel(logging.WARNING)
+    install_catalog(movie_loader, int(os.environ.get('LOADTEST_CATALOG_ROWS', 5000)))
+    warmup()
@@ -0,0 +1,329 @@
+"""Concurrent end-to-end load test against gunicorn.
+
+Starts local fake OMDb/OpenAI servers and a gunicorn instance pointed at
+them, then drives it with simulated users issuing a weighted mix of
+scenarios:
+
+    python -m benchmarks.loadtest --workers 2 --threads 4 --users 32 --duration 30 \\
+        --mix home=30,search=30,genre=15,detail=15,mood=10 --output load.json
+
+Search queries are synthetic by default; ``--replay-search-history`` reuses
+the most recent ``SearchHistory`` rows from ``--database-url`` instead.
+``--target`` skips gunicorn and drives an already running server.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.catalog import GENRES, WORDS
+from benchmarks.fake_upstreams import FakeOMDb, FakeOpenAI
+from benchmarks.run import git_revision, percentile
+
+MOODS = ['happy', 'excited', 'relaxed', 'adventurous', 'scared', 'romantic', 'thoughtful', 'sad']
+DEFAULT_MIX = 'home=30,search=30,genre=15,detail=15,mood=10'
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}', choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def load_search_history(database_url, limit):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT query FROM search_history ORDER BY created_at DESC LIMIT :limit"
+        ), {'limit': limit}).fetchall()
+    return [row[0] for row in rows if row[0]]
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, scenario, elapsed, status):
+        with self._lock:
+            self.latencies[scenario].append(elapsed)
+            self.statuses[scenario][status] += 1
+            if status == 'error' or (isinstance(status, int) and status >= 500):
+                self.errors[scenario] += 1
+
+
+class User:
+    def __init__(self, base_url, stats, queries, rows, rng, timeout):
+        self.base_url = base_url
+        self.stats = stats
+        self.queries = queries
+        self.rows = rows
+        self.rng = rng
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def get(self, scenario, path):
+        started = time.perf_counter()
+        try:
+            response = self.session.get(self.base_url + path, timeout=self.timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = 'error'
+        self.stats.record(scenario, time.perf_counter() - started, status)
+
+    def home(self):
+        self.get('home', '/')
+
+    def search(self):
+        # Search-as-you-type: one request per keystroke of the query.
+        query = self.rng.choice(self.queries)
+        for end in range(1, len(query) + 1):
+            self.get('search', f"/search?q={requests.utils.quote(query[:end])}")
+
+    def genre(self):
+        self.get('genre', f"/genre/{requests.utils.quote(self.rng.choice(GENRES))}")
+
+    def detail(self):
+        self.get('detail', f"/movie/{self.rng.randint(1, self.rows)}")
+
+    def mood(self):
+        self.get('mood', f"/recommend/mood?mood={self.rng.choice(MOODS)}")
+
+
+SCENARIOS = {name: getattr(User, name) for name in ('home', 'search', 'genre', 'detail', 'mood')}
+
+
+def drive(base_url, args, queries, mix=None, duration=None):
+    stats = Stats()
+    mix = mix or parse_mix(args.mix)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    deadline = time.monotonic() + (args.duration if duration is None else duration)
+
+    def user_loop(index):
+        rng = random.Random(args.seed + index)
+        user = User(base_url, stats, queries, args.rows, rng, args.timeout)
+        while time.monotonic() < deadline:
+            SCENARIOS[rng.choices(names, weights)[0]](user)
+            if args.think_ms:
+                time.sleep(rng.uniform(0, 2 * args.think_ms) / 1000.0)
+
+    threads = [threading.Thread(target=user_loop, args=(i,), daemon=True) for i in range(args.users)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.monotonic() - started
+
+
+def isolate(base_url, args, queries, omdb, openai):
+    """Run each scenario of the mix alone for a short phase and count the
+    upstream calls made meanwhile, since calls can't be attributed to
+    requests while scenarios run concurrently."""
+    calls = {}
+    for name in parse_mix(args.mix):
+        # Let background refreshes from the previous phase land first.
+        time.sleep(1.0)
+        omdb.calls.clear()
+        openai.calls.clear()
+        stats, _ = drive(base_url, args, queries, mix={name: 1.0}, duration=args.isolate_seconds)
+        count = sum(len(v) for v in stats.latencies.values())
+        calls[name] = {
+            'requests': count,
+            'omdb': dict(omdb.calls),
+            'openai': dict(openai.calls),
+            'omdb_per_request': sum(omdb.calls.values()) / count if count else 0.0,
+            'openai_per_request': sum(openai.calls.values()) / count if count else 0.0,
+        }
+    return calls
+
+
+def summarize(stats, elapsed):
+    scenarios = {}
+    for name, samples in sorted(stats.latencies.items()):
+        samples.sort()
+        scenarios[name] = {
+            'requests': len(samples),
+            'errors': stats.errors[name],
+            'error_rate': stats.errors[name] / len(samples),
+            'throughput_per_s': len(samples) / elapsed,
+            'p50_ms': percentile(samples, 50) * 1000,
+            'p95_ms': percentile(samples, 95) * 1000,
+            'p99_ms': percentile(samples, 99) * 1000,
+            'max_ms': samples[-1] * 1000,
+            'statuses': {str(k): v for k, v in stats.statuses[name].items()},
+        }
+    return scenarios
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url, timeout, path='/ready'):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + path, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"Server at {base_url} did not become ready in {timeout}s")
+
+
+def start_gunicorn(args, workdir, omdb, openai):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        'OMDB_API_KEY': 'loadtest',
+        'OMDB_BASE_URL': f"{omdb.url}/",
+        'OPENAI_API_KEY': 'loadtest',
+        'OPENAI_BASE_URL': openai.base_url,
+        'POSTER_CACHE_DIR': os.path.join(workdir, 'posters'),
+        'OMDB_RATE_PER_SECOND': str(args.omdb_rate),
+        'OMDB_BURST': str(args.omdb_burst),
+        'OMDB_DAILY_QUOTA': str(args.omdb_daily_quota),
+        'SESSION_SECRET': env.get('SESSION_SECRET', 'loadtest'),
+        'LOADTEST_CATALOG_ROWS': str(args.rows),
+    })
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--config', 'python:benchmarks.gunicorn_loadtest',
+        '--bind', f"127.0.0.1:{port}",
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--timeout', '120',
+        'main:app',
+    ]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                               stderr=None if args.verbose else subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def run(args):
+    queries = None
+    if args.replay_search_history:
+        if not args.database_url:
+            raise SystemExit('--replay-search-history needs --database-url')
+        queries = load_search_history(args.database_url, args.history_limit)
+        print(f"replaying {len(queries)} queries from SearchHistory", file=sys.stderr)
+    if not queries:
+        queries = [f"{a} {b}" for a in WORDS for b in WORDS]
+
+    with tempfile.TemporaryDirectory(prefix='cinemood-load-') as workdir, \
+            FakeOMDb(latency_ms=args.omdb_latency_ms, error_rate=args.omdb_error_rate) as omdb, \
+            FakeOpenAI(latency_ms=args.openai_latency_ms) as openai:
+        process = None
+        if args.target:
+            base_url = args.target.rstrip('/')
+        else:
+            process, base_url = start_gunicorn(args, workdir, omdb, openai)
+
+        try:
+            # An external target may predate /ready, so fall back to a page.
+            wait_until_ready(base_url, args.startup_timeout, '/genres' if args.target else '/ready')
+            omdb.calls.clear()
+            openai.calls.clear()
+            stats, elapsed = drive(base_url, args, queries)
+            upstream_calls = {'omdb': dict(omdb.calls), 'openai': dict(openai.calls)}
+            by_scenario = isolate(base_url, args, queries, omdb, openai) if args.isolate_seconds > 0 else {}
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+        scenarios = summarize(stats, elapsed)
+        for name, calls in by_scenario.items():
+            if name in scenarios:
+                scenarios[name]['upstream_calls'] = calls
+        return {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'target': args.target or 'gunicorn',
+                'workers': args.workers,
+                'threads': args.threads,
+                'users': args.users,
+                'duration_s': elapsed,
+                'rows': args.rows,
+                'mix': parse_mix(args.mix),
+                'omdb_latency_ms': args.omdb_latency_ms,
+                'openai_latency_ms': args.openai_latency_ms,
+                'omdb_limits': [args.omdb_rate, args.omdb_burst, args.omdb_daily_quota],
+                'isolate_seconds': args.isolate_seconds,
+            },
+            'total_requests': sum(len(v) for v in stats.latencies.values()),
+            # Per-scenario upstream calls come from the isolated phases. All
+            # counts are only meaningful when the server talks to these fakes.
+            'scenarios': scenarios,
+            'upstream_calls': upstream_calls,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', help='base URL of a running server instead of starting gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--users', type=int, default=16, help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--isolate-seconds', type=float, default=5.0,
+                        help='after the mixed run, run each scenario alone this long to count its upstream '
+                             'calls (0 to skip)')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='mean pause between scenarios')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario weights, e.g. home=50,search=50')
+    parser.add_argument('--rows', type=int, default=5000, help='synthetic catalog size')
+    parser.add_argument('--omdb-latency-ms', type=float, default=50.0)
+    parser.add_argument('--omdb-error-rate', type=float, default=0.0)
+    parser.add_argument('--openai-latency-ms', type=float, default=500.0)
+    # The defaults keep the OMDb scheduler out of the measurements; lower
+    # them to exercise throttling.
+    parser.add_argument('--omdb-rate', type=float, default=10000.0, help='OMDB_RATE_PER_SECOND for the app')
+    parser.add_argument('--omdb-burst', type=int, default=10000, help='OMDB_BURST for the app')
+    parser.add_argument('--omdb-daily-quota', type=int, default=10000000, help='OMDB_DAILY_QUOTA for the app')
+    parser.add_argument('--database-url', help='defaults to a throwaway SQLite file')
+    parser.add_argument('--replay-search-history', action='store_true')
+    parser.add_argument('--history-limit', type=int, default=5000)
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds')
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='show gunicorn output')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Benchmark the catalog loader, the recommenders and every Flask route.
+
+Upstreams are replaced by local fake OMDb/OpenAI servers and the catalog is
+generated synthetically, so numbers are comparable between commits:
+
+    python -m benchmarks.run --rows 5000 100000 --output before.json
+    python -m benchmarks.run --rows 5000 100000 --output after.json
+    python -m benchmarks.run --compare before.json after.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.catalog import install_catalog
+from benchmarks.fake_upstreams import FakeOMDb, FakeOpenAI
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def measure(fn, iterations, max_seconds, warmup=1):
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < iterations:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if time.perf_counter() - started > max_seconds and len(samples) >= 3:
+            break
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'iterations': len(samples),
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': samples[-1] * 1000,
+        'throughput_per_s': len(samples) / elapsed if elapsed else 0.0,
+        'peak_mem_kb': peak / 1024,
+    }
+
+
+def configure_environment(args, workdir, omdb, openai):
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['OMDB_API_KEY'] = 'bench'
+    os.environ['OMDB_BASE_URL'] = f"{omdb.url}/"
+    os.environ['OPENAI_API_KEY'] = 'bench'
+    os.environ['OPENAI_BASE_URL'] = openai.base_url
+    os.environ['POSTER_CACHE_DIR'] = os.path.join(workdir, 'posters')
+    os.environ['OMDB_RATE_PER_SECOND'] = str(args.omdb_rate)
+    os.environ['OMDB_BURST'] = str(args.omdb_burst)
+    os.environ['OMDB_DAILY_QUOTA'] = str(args.omdb_daily_quota)
+    os.environ.setdefault('SESSION_SECRET', 'bench')
+    if args.no_response_cache:
+        os.environ['RESPONSE_CACHE_ENABLED'] = '0'
+
+
+def build_cases(rows):
+    from main import app
+    from movie_data import movie_loader
+    from openai_service import (get_diverse_movie_sample, get_fallback_mood_recommendations,
+                                get_fallback_genre_recommendations)
+    from personalization import rerank
+
+    client = app.test_client()
+    movie_id = rows // 2
+    imdb_id = f"tt{movie_id + 100000:07d}"
+    candidates = movie_loader.get_featured_movies(limit=1000)
+    profile = movie_loader.item_vectors[::max(rows // 20, 1)].mean(axis=0)
+
+    def get(path):
+        def fetch():
+            response = client.get(path)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+        return fetch
+
+    return {
+        'loader.get_all_movies': lambda: movie_loader.get_all_movies(limit=100),
+        'loader.get_featured_movies': lambda: movie_loader.get_featured_movies(limit=100),
+        'loader.search_movies': lambda: movie_loader.search_movies('star', limit=20),
+        'loader.get_movies_by_genre': lambda: movie_loader.get_movies_by_genre('Drama', limit=30),
+        'loader.get_movie_by_id': lambda: movie_loader.get_movie_by_id(movie_id),
+        'loader.get_all_genres': movie_loader.get_all_genres,
+        'loader.get_random_movies': lambda: movie_loader.get_random_movies(count=10),
+        'loader.discover': lambda: movie_loader.discover(genres=['Thriller'], year_min=1990, year_max=1999,
+                                                         runtime_max=120, rating_min=7, sort='vote_average'),
+        'recommend.get_diverse_movie_sample': lambda: get_diverse_movie_sample(candidates, sample_size=200),
+        'recommend.fallback_mood': lambda: get_fallback_mood_recommendations('happy', candidates, limit=12),
+        'recommend.fallback_genre': lambda: get_fallback_genre_recommendations('Comedy', candidates, limit=12),
+        'recommend.personalized_rerank': lambda: rerank(candidates[:100], profile),
+        'route.index': get('/'),
+        'route.search': get('/search?q=star'),
+        'route.search_suggest': get('/search/suggest?q=sta'),
+        'route.discover': get('/discover?genre=Thriller&year_min=1990&year_max=1999&runtime_max=120&rating_min=7'),
+        'route.recommend_mood': get('/recommend/mood?mood=happy'),
+        'route.recommend_genre': get('/recommend/genre?genre=Comedy'),
+        'route.movie_detail': get(f"/movie/{movie_id}"),
+        'route.genres': get('/genres'),
+        'route.genre_movies': get('/genre/Drama'),
+        'route.poster': get(f"/poster/{imdb_id}?size=card"),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    with tempfile.TemporaryDirectory(prefix='cinemood-bench-') as workdir, \
+            FakeOMDb(latency_ms=args.omdb_latency_ms) as omdb, \
+            FakeOpenAI(latency_ms=args.openai_latency_ms) as openai:
+        configure_environment(args, workdir, omdb, openai)
+
+        t0 = time.perf_counter()
+        from movie_data import movie_loader
+        import main  # noqa: F401
+        import_seconds = time.perf_counter() - t0
+
+        from app import app, db
+        with app.app_context():
+            db.create_all()
+
+        logging.getLogger().setLevel(logging.WARNING)
+        only = re.compile(args.only) if args.only else None
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'omdb_latency_ms': args.omdb_latency_ms,
+                'openai_latency_ms': args.openai_latency_ms,
+                'omdb_limits': [args.omdb_rate, args.omdb_burst, args.omdb_daily_quota],
+                'response_cache': not args.no_response_cache,
+                'import_seconds': import_seconds,
+            },
+            'runs': []
+        }
+
+        for rows in args.rows:
+            t0 = time.perf_counter()
+            install_catalog(movie_loader, rows)
+            run_report = {'rows': rows, 'load_seconds': time.perf_counter() - t0, 'results': {}}
+            print(f"catalog: {rows} rows in {run_report['load_seconds']:.2f}s", file=sys.stderr)
+
+            for name, fn in build_cases(rows).items():
+                if only and not only.search(name):
+                    continue
+                calls_before = sum(omdb.calls.values()) + sum(openai.calls.values())
+                try:
+                    result = measure(fn, args.iterations, args.max_seconds)
+                except Exception as e:
+                    result = {'error': str(e)}
+                result['upstream_calls'] = sum(omdb.calls.values()) + sum(openai.calls.values()) - calls_before
+                run_report['results'][name] = result
+                if 'error' in result:
+                    print(f"  {name:40s} ERROR {result['error']}", file=sys.stderr)
+                else:
+                    print(f"  {name:40s} p50 {result['p50_ms']:9.2f}ms  p95 {result['p95_ms']:9.2f}ms  "
+                          f"p99 {result['p99_ms']:9.2f}ms  peak {result['peak_mem_kb']:9.0f}KB",
+                          file=sys.stderr)
+
+            report['runs'].append(run_report)
+
+        # Flush pending writes now; at interpreter exit the SQLite file in
+        # workdir would already be gone.
+        import write_behind
+        write_behind.shutdown_all()
+        return report
+
+
+def compare(before_path, after_path, metric):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    before_runs = {r['rows']: r['results'] for r in before['runs']}
+    print(f"{'rows':>8}  {'case':40s} {'before':>10} {'after':>10} {'change':>8}  ({metric})")
+    for run_report in after['runs']:
+        old_results = before_runs.get(run_report['rows'], {})
+        for name, new in run_report['results'].items():
+            old = old_results.get(name)
+            if not old or metric not in old or metric not in new:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            print(f"{run_report['rows']:>8}  {name:40s} {old[metric]:10.2f} {new[metric]:10.2f} {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[5000],
+                        help='catalog sizes to benchmark, e.g. 5000 100000 1000000')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help='stop timing a case after this long (at least 3 iterations)')
+    parser.add_argument('--omdb-latency-ms', type=float, default=20.0)
+    parser.add_argument('--openai-latency-ms', type=float, default=200.0)
+    # The defaults keep the OMDb scheduler out of the measurements; lower
+    # them to exercise throttling.
+    parser.add_argument('--omdb-rate', type=float, default=10000.0, help='OMDB_RATE_PER_SECOND for the app')
+    parser.add_argument('--omdb-burst', type=int, default=10000, help='OMDB_BURST for the app')
+    parser.add_argument('--omdb-daily-quota', type=int, default=10000000, help='OMDB_DAILY_QUOTA for the app')
+    parser.add_argument('--database-url', help='defaults to a throwaway SQLite file')
+    parser.add_argument('--no-response-cache', action='store_true')
+    parser.add_argument('--only', help='regex selecting case names')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='print the change between two reports and exit')
+    parser.add_argument('--metric', default='p50_ms', help='metric used by --compare')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare[0], args.compare[1], args.metric)
+        return
+
+    report = run(args)
+    output = json.dumps(report, indent=2, default=float)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Gunicorn settings for production and the Replit workflow.
+
+Each worker warms up in ``post_fork`` (catalog, indexes, database pool,
+upstream clients) before it starts accepting requests, so the first
+visitor does not pay for loading the catalog.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+# Request threads only block on futures while the worker's shared event loop
+# does the upstream I/O, so they are cheap; a worker can hold this many slow
+# OMDb/OpenAI requests in flight at once. Database reads from the loop run on
+# DB_POOL_SIZE threads (see app.py), so they don't queue for a connection.
+threads = int(os.environ.get('GUNICORN_THREADS', 128))
+# Leave room for loading the full catalog before the first heartbeat.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+
+def post_fork(server, worker):
+    from warmup import warmup
+
+    warmup()
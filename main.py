@@ -1,42 +1,138 @@
 from app import app
-from flask import render_template, request, jsonify
+from flask import render_template, request, jsonify, send_file, url_for
+import asyncio
 import logging
+import os
+import async_runtime
+import metrics
 from movie_data import movie_loader
-from omdb_api import get_movie_details, get_poster_url, enrich_movie_with_omdb
-from openai_service import get_mood_based_recommendations, get_genre_recommendations
+from omdb_api import (get_movie_details_async, get_poster_url_async, enrich_movie_with_omdb_async, cache_key,
+                      OMDB_OFFLINE, PRIORITY_HERO, PRIORITY_VISIBLE, PRIORITY_BELOW_FOLD)
+from personalization import current_profile, has_profile, record_recommendations, record_view, rerank
+from openai_service import (get_mood_based_recommendations_async, get_genre_recommendations_async,
+                            get_fallback_mood_recommendations, get_fallback_genre_recommendations)
+from poster_cache import get_cached_poster, POSTER_MAX_AGE
+from response_cache import (cached_page, cached_fragment, get_fragment, set_fragment, skip_response_cache,
+                            throttled_lookups)
+from search_suggest import record_search, suggest
+from warmup import status as warmup_status
 
 logger = logging.getLogger(__name__)
 
+metrics.init_app(app)
+
+
+def _movie_lookup(movie):
+    imdb_id = movie.get('imdb_id')
+    if imdb_id:
+        return {'imdb_id': imdb_id}
+    return {'title': movie.get('title')}
+
+
+def _proxied_poster(movie, poster, size='card'):
+    # An offline server may have no route to the image host either, so let
+    # the browser load the poster directly.
+    if poster and movie.get('imdb_id') and not OMDB_OFFLINE:
+        return url_for('poster', imdb_id=movie['imdb_id'], size=size)
+    return poster
+
+
+async def _lookup_posters(movies, visible=None):
+    # The first `visible` cards (all by default) are looked up ahead of the
+    # rest when the OMDb budget is tight.
+    visible = len(movies) if visible is None else visible
+    return await asyncio.gather(*(
+        get_poster_url_async(**_movie_lookup(movie),
+                             priority=PRIORITY_VISIBLE if position < visible else PRIORITY_BELOW_FOLD)
+        for position, movie in enumerate(movies)
+    ))
+
+
+def _apply_posters(movies, posters, size='card'):
+    for movie, poster in zip(movies, posters):
+        movie['poster_url'] = _proxied_poster(movie, poster, size)
+
+
+def _attach_posters(movies, size='card', visible=None):
+    _apply_posters(movies, async_runtime.run(_lookup_posters(movies, visible)), size)
+
+
+async def _recommend_with_posters(ranking, local_candidates, profile=None, count=6):
+    # Start poster lookups for the locally ranked candidates while the LLM
+    # is still thinking; overlapping picks are then cache hits or join the
+    # in-flight request.
+    prefetch = asyncio.ensure_future(_lookup_posters(rerank(local_candidates, profile)[:count], visible=0))
+    recommended = rerank(await ranking, profile)
+    posters = await _lookup_posters(recommended[:count])
+    await prefetch
+    return recommended, posters
+
+
+def _home_rows():
+    # (fragment name, loader, cards shown with posters, cards looked up first)
+    return (
+        ('featured', lambda: movie_loader.get_featured_movies(limit=20), 10, 6),
+        ('genre:Action:10', lambda: movie_loader.get_movies_by_genre('Action', limit=10), 5, 0),
+        ('genre:Comedy:10', lambda: movie_loader.get_movies_by_genre('Comedy', limit=10), 5, 0),
+    )
+
+
+async def _lookup_rows(batches, hero=None):
+    lookups = [_lookup_posters(movies, visible) for movies, visible in batches]
+    if hero is not None:
+        lookups.append(get_movie_details_async(**_movie_lookup(hero), priority=PRIORITY_HERO))
+    results = await asyncio.gather(*lookups)
+    return results[:len(batches)], results[len(batches)] if hero is not None else None
+
+
+def _load_rows(specs, profile, with_hero=False):
+    """Return each row from its cached fragment or its loader, re-ranked for
+    ``profile``, with every missing poster (and the hero's details) looked
+    up in one concurrent batch. Rows that were built or completed are cached
+    afterwards, minus posters the OMDb budget refused.
+    """
+    rows, batches, fresh = [], [], []
+    for name, load, posters, visible in specs:
+        cached = get_fragment(name)
+        movies = load() if cached is None else cached
+        shown = rerank(movies, profile)
+        # A row being built (or one cached while OMDb was throttled) also
+        # needs posters for its unpersonalized order, which other visitors see.
+        incomplete = any('poster_url' not in m for m in movies[:posters])
+        wanted = shown[:posters] + (movies[:posters] if incomplete else [])
+        missing = list({id(m): m for m in wanted if 'poster_url' not in m}.values())
+        ahead = sum(1 for m in shown[:visible] if 'poster_url' not in m)
+        batches.append((missing, ahead))
+        rows.append(shown)
+        if incomplete:
+            fresh.append((name, movies))
+
+    hero = rows[0][0] if with_hero and rows and rows[0] else None
+    posters, hero_data = async_runtime.run(_lookup_rows(batches, hero))
+    for (missing, _), found in zip(batches, posters):
+        _apply_posters(missing, found)
+    throttled = throttled_lookups()
+    for name, movies in fresh:
+        keys = [cache_key(**_movie_lookup(m)) if 'poster_url' in m else None for m in movies]
+        # Leave refused posters out so the next render looks them up again.
+        movies = [{k: v for k, v in m.items() if k != 'poster_url'} if key in throttled else m
+                  for m, key in zip(movies, keys)]
+        set_fragment(name, movies, [key for key in keys if key and key not in throttled])
+
+    if hero is not None and hero_data:
+        hero['poster_url'] = _proxied_poster(hero, hero_data.get('poster'), 'hero')
+        hero['imdb_rating'] = hero_data.get('imdb_rating')
+        hero['director'] = hero_data.get('director')
+    return rows, hero
+
 
 @app.route('/')
+@cached_page(bypass=has_profile)
 def index():
     try:
-        featured_movies = movie_loader.get_featured_movies(limit=20)
-
-        for movie in featured_movies[:10]:
-            poster = get_poster_url(title=movie.get('title'))
-            movie['poster_url'] = poster
-
-        hero_movie = None
-        if featured_movies:
-            hero_movie = featured_movies[0]
-            omdb_data = get_movie_details(title=hero_movie.get('title'))
-            if omdb_data:
-                hero_movie['poster_url'] = omdb_data.get('poster')
-                hero_movie['imdb_rating'] = omdb_data.get('imdb_rating')
-                hero_movie['director'] = omdb_data.get('director')
-
-        genres = movie_loader.get_all_genres()
-
-        action_movies = movie_loader.get_movies_by_genre('Action', limit=10)
-        for movie in action_movies[:5]:
-            poster = get_poster_url(title=movie.get('title'))
-            movie['poster_url'] = poster
-
-        comedy_movies = movie_loader.get_movies_by_genre('Comedy', limit=10)
-        for movie in comedy_movies[:5]:
-            poster = get_poster_url(title=movie.get('title'))
-            movie['poster_url'] = poster
+        (featured_movies, action_movies, comedy_movies), hero_movie = _load_rows(
+            _home_rows(), current_profile(), with_hero=True)
+        genres = cached_fragment('genres', movie_loader.get_all_genres)
 
         return render_template('index.html',
                                hero_movie=hero_movie,
@@ -46,6 +142,7 @@ def index():
                                genres=genres)
     except Exception as e:
         logger.error(f"Error in index route: {e}")
+        skip_response_cache()
         return render_template('index.html',
                                hero_movie=None,
                                featured_movies=[],
@@ -60,12 +157,12 @@ def search():
     if not query:
         return jsonify({'movies': []})
 
+    record_search(query)
+
     try:
         movies = movie_loader.search_movies(query, limit=20)
 
-        for movie in movies[:8]:
-            poster = get_poster_url(title=movie.get('title'))
-            movie['poster_url'] = poster
+        _attach_posters(movies[:8])
 
         return jsonify({'movies': movies})
     except Exception as e:
@@ -73,6 +170,50 @@ def search():
         return jsonify({'movies': [], 'error': str(e)})
 
 
+@app.route('/search/suggest')
+def search_suggest():
+    query = request.args.get('q', '')
+    if not query:
+        return jsonify({'suggestions': []})
+
+    try:
+        limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+        return jsonify({'suggestions': suggest(query, limit=limit)})
+    except Exception as e:
+        logger.error(f"Error in search suggest: {e}")
+        return jsonify({'suggestions': [], 'error': str(e)})
+
+
+@app.route('/discover')
+def discover():
+    genres = [g for value in request.args.getlist('genre') for g in value.split(',') if g]
+
+    try:
+        result = movie_loader.discover(
+            genres=genres,
+            year_min=request.args.get('year_min', type=int),
+            year_max=request.args.get('year_max', type=int),
+            runtime_min=request.args.get('runtime_min', type=int),
+            runtime_max=request.args.get('runtime_max', type=int),
+            rating_min=request.args.get('rating_min', type=float),
+            rating_max=request.args.get('rating_max', type=float),
+            votes_min=request.args.get('votes_min', type=int),
+            keyword=request.args.get('keyword'),
+            cast=request.args.get('cast'),
+            sort=request.args.get('sort', 'popularity'),
+            descending=request.args.get('order', 'desc') != 'asc',
+            limit=min(request.args.get('limit', 20, type=int), 100),
+            offset=max(request.args.get('offset', 0, type=int), 0)
+        )
+
+        _attach_posters(result['movies'][:8], visible=4)
+
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error in discover: {e}")
+        return jsonify({'movies': [], 'total': 0, 'facets': {}, 'error': str(e)})
+
+
 @app.route('/recommend/mood')
 def recommend_by_mood():
     mood = request.args.get('mood', '')
@@ -81,11 +222,13 @@ def recommend_by_mood():
 
     try:
         all_movies = movie_loader.get_featured_movies(limit=100)
-        recommended = get_mood_based_recommendations(mood, all_movies, limit=12)
-
-        for movie in recommended[:6]:
-            poster = get_poster_url(title=movie.get('title'))
-            movie['poster_url'] = poster
+        recommended, posters = async_runtime.run(_recommend_with_posters(
+            get_mood_based_recommendations_async(mood, all_movies, limit=12),
+            get_fallback_mood_recommendations(mood, all_movies, limit=12),
+            profile=current_profile()
+        ))
+        _apply_posters(recommended[:6], posters)
+        record_recommendations(recommended[:6])
 
         return jsonify({'movies': recommended, 'mood': mood})
     except Exception as e:
@@ -101,11 +244,13 @@ def recommend_by_genre():
 
     try:
         all_movies = movie_loader.get_featured_movies(limit=100)
-        recommended = get_genre_recommendations(genre, all_movies, limit=12)
-
-        for movie in recommended[:6]:
-            poster = get_poster_url(title=movie.get('title'))
-            movie['poster_url'] = poster
+        recommended, posters = async_runtime.run(_recommend_with_posters(
+            get_genre_recommendations_async(genre, all_movies, limit=12),
+            get_fallback_genre_recommendations(genre, all_movies, limit=12),
+            profile=current_profile()
+        ))
+        _apply_posters(recommended[:6], posters)
+        record_recommendations(recommended[:6])
 
         return jsonify({'movies': recommended, 'genre': genre})
     except Exception as e:
@@ -120,16 +265,20 @@ def movie_detail(movie_id):
         if not movie:
             return render_template('404.html'), 404
 
-        movie = enrich_movie_with_omdb(movie)
+        record_view(movie_id)
 
-        similar_movies = movie_loader.get_movies_by_genre(
+        # Over-fetch so the visitor's profile has something to choose from.
+        similar_movies = rerank(movie_loader.get_movies_by_genre(
             movie.get('genres', ['Drama'])[0] if movie.get('genres') else 'Drama',
-            limit=6
-        )
+            limit=12
+        ), current_profile())[:6]
 
-        for m in similar_movies[:4]:
-            poster = get_poster_url(title=m.get('title'))
-            m['poster_url'] = poster
+        movie, similar_posters = async_runtime.run(async_runtime.gather(
+            enrich_movie_with_omdb_async(movie, priority=PRIORITY_HERO),
+            _lookup_posters(similar_movies[:4], visible=0)
+        ))
+        movie['poster_url'] = _proxied_poster(movie, movie.get('poster_url'), 'hero')
+        _apply_posters(similar_movies[:4], similar_posters)
 
         return render_template('movie_detail.html', movie=movie, similar_movies=similar_movies)
     except Exception as e:
@@ -138,34 +287,80 @@ def movie_detail(movie_id):
 
 
 @app.route('/genres')
+@cached_page
 def genres():
     try:
-        all_genres = movie_loader.get_all_genres()
+        all_genres = cached_fragment('genres', movie_loader.get_all_genres)
         return render_template('genres.html', genres=all_genres)
     except Exception as e:
         logger.error(f"Error in genres: {e}")
+        skip_response_cache()
         return render_template('genres.html', genres=[])
 
 
 @app.route('/genre/<genre_name>')
+@cached_page(bypass=has_profile)
 def genre_movies(genre_name):
     try:
-        movies = movie_loader.get_movies_by_genre(genre_name, limit=30)
-
-        for movie in movies[:12]:
-            poster = get_poster_url(title=movie.get('title'))
-            movie['poster_url'] = poster
-
+        (movies,), _ = _load_rows([(f"genre:{genre_name.lower()}:30",
+                                    lambda: movie_loader.get_movies_by_genre(genre_name, limit=30), 12, 6)],
+                                  current_profile())
         return render_template('genre_movies.html', genre=genre_name, movies=movies)
     except Exception as e:
         logger.error(f"Error in genre movies: {e}")
+        skip_response_cache()
         return render_template('genre_movies.html', genre=genre_name, movies=[])
 
 
+@app.route('/poster/<imdb_id>')
+def poster(imdb_id):
+    size = request.args.get('size', 'card')
+    # Only catalog movies, so arbitrary ids can't be used to spend OMDb quota.
+    if not movie_loader.has_imdb_id(imdb_id):
+        return '', 404
+    try:
+        cached = get_cached_poster(imdb_id, size)
+    except Exception as e:
+        logger.error(f"Error serving poster {imdb_id}: {e}")
+        cached = None
+
+    if not cached:
+        return '', 404
+
+    return send_file(cached['path'],
+                     mimetype=cached['mimetype'],
+                     etag=cached['etag'],
+                     conditional=True,
+                     max_age=POSTER_MAX_AGE)
+
+
+@app.route('/ready')
+def ready():
+    status = warmup_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
 
 
+def _check_tables():
+    from app import db
+
+    with app.app_context():
+        missing = set(db.metadata.tables) - set(db.inspect(db.engine).get_table_names())
+    if missing:
+        logger.error(f"Missing database tables ({', '.join(sorted(missing))}); "
+                     f"run `flask --app app init-db` first")
+
+
 if __name__ == '__main__':
+    from warmup import warmup
+
+    # The dev server has no gunicorn post_fork hook, so warm up here, in the
+    # reloader's serving process only.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        _check_tables()
+        warmup()
     app.run(host='0.0.0.0', port=5000, debug=True)
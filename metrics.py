@@ -0,0 +1,217 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+SERVER_TIMING_ENABLED = METRICS_ENABLED and os.environ.get("SERVER_TIMING_ENABLED", "0") == "1"
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_SPAN = nullcontext()
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'total', 'count')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def observe(name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram()
+        histogram.observe(value)
+
+
+def inc(name, amount=1, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    if has_request_context():
+        request_counts = g.setdefault('_metric_counts', {})
+        request_counts[key] = request_counts.get(key, 0) + amount
+
+
+def register_gauge(name, fn, **labels):
+    """Report ``fn()`` as a gauge each time /metrics is scraped."""
+    _gauges[(name, tuple(sorted(labels.items())))] = fn
+
+
+def cache_lookup(cache, hit):
+    inc('cinemood_cache_lookups_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def upstream_error(upstream):
+    inc('cinemood_upstream_errors_total', upstream=upstream)
+
+
+class _Span:
+    __slots__ = ('subsystem', 'started')
+
+    def __init__(self, subsystem):
+        self.subsystem = subsystem
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record_span(self.subsystem, time.perf_counter() - self.started)
+        return False
+
+
+def _record_span(subsystem, elapsed):
+    observe('cinemood_span_seconds', elapsed, subsystem=subsystem)
+    if has_request_context():
+        spans = g.setdefault('_metric_spans', {})
+        count, total = spans.get(subsystem, (0, 0.0))
+        spans[subsystem] = (count + 1, total + elapsed)
+
+
+def span(subsystem):
+    """Time a block of work against a subsystem (pandas, postgres, omdb, ...)."""
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _Span(subsystem)
+
+
+def timed(subsystem):
+    """Decorator form of :func:`span`; a no-op when metrics are disabled."""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(subsystem):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{str(v)}"' for k, v in items) + '}'
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        histograms = {k: (list(h.buckets), h.total, h.count) for k, h in _histograms.items()}
+        counters = dict(_counters)
+
+    seen = set()
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, buckets):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_format_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), fn in sorted(_gauges.items(), key=lambda item: item[0]):
+        try:
+            value = fn()
+        except Exception as e:
+            logger.debug(f"Could not collect gauge {name}: {e}")
+            continue
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def _server_timing():
+    entries = []
+    for subsystem, (count, total) in sorted(g.get('_metric_spans', {}).items()):
+        entries.append(f'{subsystem};dur={total * 1000:.1f};desc="{count}x"')
+
+    lookups = {}
+    for (name, labels), value in g.get('_metric_counts', {}).items():
+        if name == 'cinemood_cache_lookups_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    for cache, (hits, total) in sorted(lookups.items()):
+        entries.append(f'cache-{cache};desc="{hits}/{total} hits"')
+
+    return ', '.join(entries)
+
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        @app.route('/metrics')
+        def metrics_disabled():
+            return Response('# metrics disabled (set METRICS_ENABLED=1)\n', status=404,
+                            mimetype='text/plain')
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g._metric_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('_metric_started')
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            observe('cinemood_request_seconds', elapsed,
+                    endpoint=request.endpoint or 'unknown', status=response.status_code // 100 * 100)
+            if SERVER_TIMING_ENABLED:
+                timing = _server_timing()
+                total = f"total;dur={elapsed * 1000:.1f}"
+                response.headers['Server-Timing'] = f"{timing}, {total}" if timing else total
+        return response
+
+    def render_started(sender, template, context, **extra):
+        g._metric_render_started = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        started = g.pop('_metric_render_started', None)
+        if started is not None:
+            _record_span('jinja', time.perf_counter() - started)
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -58,3 +58,12 @@ class OMDbCache(db.Model):
 
     def __repr__(self):
         return f'<OMDbCache {self.title}>'
+
+
+class OMDbQuota(db.Model):
+    __tablename__ = 'omdb_quota'
+    day = db.Column(db.Date, primary_key=True)
+    used = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<OMDbQuota {self.day}: {self.used}>'
@@ -1,10 +1,35 @@
-import pandas as pd
 import ast
+import hashlib
 import os
 import logging
+from datetime import datetime
+
+from metrics import span, timed
 
 logger = logging.getLogger(__name__)
 
+# pandas and numpy are imported by the first catalog load rather than at
+# module import, so importing this module stays cheap (see warmup.py).
+pd = None
+np = None
+
+# Numeric columns precomputed as float arrays for /discover filtering and sorting.
+FACET_NUMERIC_COLUMNS = ('popularity', 'vote_average', 'vote_count', 'year', 'runtime')
+# Most frequent keywords and cast members used as item vector features,
+# next to every genre.
+ITEM_VECTOR_KEYWORDS = int(os.environ.get("ITEM_VECTOR_KEYWORDS", 64))
+ITEM_VECTOR_CAST = int(os.environ.get("ITEM_VECTOR_CAST", 64))
+
+
+def _load_libraries():
+    global pd, np
+
+    if pd is None:
+        import numpy
+        import pandas
+
+        np, pd = numpy, pandas
+
 
 class MovieDataLoader:
     def __init__(self):
@@ -13,39 +38,195 @@ class MovieDataLoader:
         self.keywords_df = None
         self.links_df = None
         self._loaded = False
+        self.version = 0
+        self.loaded_at = None
+        self.facets = None
+        self.item_vectors = None
+        self.item_features = []
+        # Identifies the feature columns, so stored profiles can tell whether
+        # they still line up with item_vectors.
+        self.item_features_digest = None
+        self._id_index = None
+        self._imdb_ids = frozenset()
 
     def load_data(self):
         if self._loaded:
             return
 
+        _load_libraries()
+
         try:
             movies_path = 'attached_assets/tmdb_5000_movies_1764503479928.csv'
             credits_path = 'attached_assets/tmdb_5000_credits_1764503490293.csv'
             keywords_path = 'attached_assets/keywords_1_1764503399886.csv'
             links_path = 'attached_assets/links_1764503413375.csv'
 
-            if os.path.exists(movies_path):
-                self.movies_df = pd.read_csv(movies_path)
-                logger.info(f"Loaded {len(self.movies_df)} movies from tmdb_5000_movies")
+            with span('catalog_load'):
+                if os.path.exists(movies_path):
+                    self.movies_df = pd.read_csv(movies_path)
+                    logger.info(f"Loaded {len(self.movies_df)} movies from tmdb_5000_movies")
 
-            if os.path.exists(credits_path):
-                self.credits_df = pd.read_csv(credits_path)
-                logger.info(f"Loaded {len(self.credits_df)} credits")
+                if os.path.exists(credits_path):
+                    self.credits_df = pd.read_csv(credits_path)
+                    logger.info(f"Loaded {len(self.credits_df)} credits")
 
-            if os.path.exists(keywords_path):
-                self.keywords_df = pd.read_csv(keywords_path)
-                logger.info(f"Loaded {len(self.keywords_df)} keywords")
+                if os.path.exists(keywords_path):
+                    self.keywords_df = pd.read_csv(keywords_path)
+                    logger.info(f"Loaded {len(self.keywords_df)} keywords")
 
-            if os.path.exists(links_path):
-                self.links_df = pd.read_csv(links_path)
-                logger.info(f"Loaded {len(self.links_df)} links")
+                if os.path.exists(links_path):
+                    self.links_df = pd.read_csv(links_path)
+                    logger.info(f"Loaded {len(self.links_df)} links")
 
-            self._loaded = True
+                self._finish_load()
 
         except Exception as e:
             logger.error(f"Error loading movie data: {e}")
             raise
 
+    def load_frames(self, movies_df, credits_df=None, keywords_df=None, links_df=None):
+        """Install already-built frames (e.g. a synthetic catalog) in place of the CSVs."""
+        self.movies_df = movies_df
+        self.credits_df = credits_df
+        self.keywords_df = keywords_df
+        self.links_df = links_df
+        self._finish_load()
+
+    def _finish_load(self):
+        _load_libraries()
+        self._join_links()
+        self._build_facets()
+        self._build_item_vectors()
+        self._loaded = True
+        self.version += 1
+        self.loaded_at = datetime.utcnow()
+
+    def _join_links(self):
+        if self.movies_df is None:
+            return
+
+        self.movies_df['imdb_id'] = None
+        self._imdb_ids = frozenset()
+        if self.links_df is None or 'tmdbId' not in self.links_df or 'imdbId' not in self.links_df:
+            return
+
+        links = self.links_df.dropna(subset=['tmdbId', 'imdbId'])
+        links = links.drop_duplicates(subset='tmdbId')
+        imdb_by_tmdb = dict(zip(
+            links['tmdbId'].astype(int),
+            links['imdbId'].map(self.format_imdb_id)
+        ))
+
+        imdb_ids = self.movies_df['id'].map(imdb_by_tmdb)
+        self.movies_df['imdb_id'] = imdb_ids.astype(object).where(imdb_ids.notna(), None)
+        self._imdb_ids = frozenset(imdb_ids.dropna())
+        logger.info(f"Linked {int(imdb_ids.notna().sum())} movies to IMDb ids")
+
+    def _name_index(self, values, extract):
+        # Parse each distinct serialized list once and map names to the codes
+        # of the rows that contain them.
+        codes, uniques = pd.factorize(values.fillna('[]'))
+        index = {}
+        for code, value in enumerate(uniques):
+            for name in extract(value):
+                if name:
+                    index.setdefault(name.lower(), []).append(code)
+        return codes, {name: np.array(c, dtype=codes.dtype) for name, c in index.items()}
+
+    def _build_facets(self):
+        if self.movies_df is None:
+            self.facets = None
+            return
+
+        df = self.movies_df
+        facets = {
+            'year': pd.to_datetime(df['release_date'], errors='coerce').dt.year.to_numpy(dtype=float),
+        }
+        for column in FACET_NUMERIC_COLUMNS:
+            if column != 'year':
+                facets[column] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+
+        genre_codes, genre_index = self._name_index(df['genres'], self.get_genre_names)
+        genre_display = {}
+        for genres_str in pd.unique(df['genres'].dropna()):
+            for name in self.get_genre_names(genres_str):
+                genre_display.setdefault(name.lower(), name)
+        facets['genre_names'] = [genre_display[key] for key in sorted(genre_index)]
+        facets['genre_matrix'] = np.column_stack([
+            np.isin(genre_codes, genre_index[key]) for key in sorted(genre_index)
+        ]) if genre_index else np.zeros((len(df), 0), dtype=bool)
+
+        facets['keyword_codes'], facets['keyword_index'] = self._name_index(
+            df['keywords'], self.get_keyword_names)
+
+        cast = pd.Series([None] * len(df), dtype=object)
+        if self.credits_df is not None:
+            cast_by_movie = self.credits_df.drop_duplicates(subset='movie_id').set_index('movie_id')['cast']
+            cast = df['id'].map(cast_by_movie)
+        facets['cast_codes'], facets['cast_index'] = self._name_index(
+            cast, lambda value: self.get_cast_names(value, limit=None))
+
+        self.facets = facets
+        logger.info(f"Built facet arrays for {len(df)} movies, {len(facets['genre_names'])} genres")
+
+    def _top_names(self, codes, index, limit):
+        rows_per_code = np.bincount(codes)
+        counts = {name: int(rows_per_code[c].sum()) for name, c in index.items()}
+        return sorted(counts, key=lambda name: (-counts[name], name))[:limit]
+
+    def _build_item_vectors(self):
+        if self.facets is None:
+            self.item_vectors = None
+            self.item_features = []
+            self.item_features_digest = None
+            self._id_index = None
+            return
+
+        facets = self.facets
+        columns = [facets['genre_matrix']]
+        features = [f"genre:{name}" for name in facets['genre_names']]
+        for kind, limit in (('keyword', ITEM_VECTOR_KEYWORDS), ('cast', ITEM_VECTOR_CAST)):
+            codes, index = facets[f"{kind}_codes"], facets[f"{kind}_index"]
+            names = self._top_names(codes, index, limit)
+            if names:
+                columns.append(np.column_stack([np.isin(codes, index[name]) for name in names]))
+                features.extend(f"{kind}:{name}" for name in names)
+
+        vectors = np.hstack(columns).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+        self.item_vectors = vectors
+        self.item_features = features
+        self.item_features_digest = hashlib.sha1('\n'.join(features).encode('utf-8')).hexdigest()[:16]
+        ids = self.movies_df['id']
+        first = ~ids.duplicated().to_numpy()
+        self._id_index = pd.Series(np.arange(len(ids))[first], index=ids[first].to_numpy())
+        logger.info(f"Built item vectors with {len(features)} features")
+
+    def item_rows(self, movie_ids):
+        """Row positions in ``item_vectors`` for ``movie_ids`` (-1 if unknown)."""
+        self.load_data()
+        if self._id_index is None:
+            return np.full(len(movie_ids), -1)
+        return self._id_index.reindex(movie_ids).fillna(-1).to_numpy(dtype=np.int64)
+
+    def has_imdb_id(self, imdb_id):
+        self.load_data()
+        return imdb_id in self._imdb_ids
+
+    @staticmethod
+    def format_imdb_id(imdb_id):
+        if imdb_id is None or pd.isna(imdb_id) or imdb_id == '':
+            return None
+        imdb_id = str(imdb_id).strip()
+        if imdb_id.startswith('tt'):
+            imdb_id = imdb_id[2:]
+        try:
+            return f"tt{int(float(imdb_id)):07d}"
+        except ValueError:
+            return None
+
     def parse_json_field(self, field):
         if pd.isna(field) or field == '' or field == '[]':
             return []
@@ -69,6 +250,7 @@ class MovieDataLoader:
         names = [c.get('name', '') for c in cast[:limit] if isinstance(c, dict)]
         return names
 
+    @timed('pandas')
     def get_all_movies(self, limit=100):
         self.load_data()
         if self.movies_df is None:
@@ -89,25 +271,28 @@ class MovieDataLoader:
                 'vote_count': row.get('vote_count', 0),
                 'popularity': row.get('popularity', 0),
                 'runtime': row.get('runtime', 0),
-                'imdb_id': None
+                'imdb_id': row.get('imdb_id')
             }
             movies.append(movie)
 
         return movies
 
+    @timed('pandas')
     def get_featured_movies(self, limit=20):
         self.load_data()
         if self.movies_df is None:
             return []
 
-        df = self.movies_df.copy()
-        df['vote_average'] = pd.to_numeric(df['vote_average'], errors='coerce').fillna(0)
-        df['vote_count'] = pd.to_numeric(df['vote_count'], errors='coerce').fillna(0)
-        df['popularity'] = pd.to_numeric(df['popularity'], errors='coerce').fillna(0)
-
-        df = df[df['vote_count'] > 100]
-        df = df.sort_values(by=['popularity', 'vote_average'], ascending=False)
-        df = df.head(limit)
+        facets = self.facets
+        positions = np.flatnonzero(np.nan_to_num(facets['vote_count']) > 100)
+        popularity = np.nan_to_num(facets['popularity'][positions])
+        rating = np.nan_to_num(facets['vote_average'][positions])
+        order = np.lexsort((-rating, -popularity))[:limit]
+        df = self.movies_df.iloc[positions[order]].assign(
+            vote_average=rating[order],
+            vote_count=np.nan_to_num(facets['vote_count'][positions[order]]),
+            popularity=popularity[order]
+        )
 
         movies = []
         for _, row in df.iterrows():
@@ -121,12 +306,14 @@ class MovieDataLoader:
                 'vote_average': row.get('vote_average', 0),
                 'vote_count': row.get('vote_count', 0),
                 'popularity': row.get('popularity', 0),
-                'runtime': row.get('runtime', 0)
+                'runtime': row.get('runtime', 0),
+                'imdb_id': row.get('imdb_id')
             }
             movies.append(movie)
 
         return movies
 
+    @timed('pandas')
     def search_movies(self, query, limit=20):
         self.load_data()
         if self.movies_df is None or not query:
@@ -147,29 +334,28 @@ class MovieDataLoader:
                 'genres': self.get_genre_names(row.get('genres', '[]')),
                 'release_date': row.get('release_date', ''),
                 'vote_average': row.get('vote_average', 0),
-                'popularity': row.get('popularity', 0)
+                'popularity': row.get('popularity', 0),
+                'imdb_id': row.get('imdb_id')
             }
             movies.append(movie)
 
         return movies
 
+    @timed('pandas')
     def get_movies_by_genre(self, genre, limit=20):
         self.load_data()
         if self.movies_df is None:
             return []
 
+        # Substring match on genre names, as before, but against the
+        # precomputed genre matrix instead of re-parsing every row.
         genre_lower = genre.lower()
-        df = self.movies_df.copy()
-
-        def has_genre(genres_str):
-            genres = self.get_genre_names(genres_str)
-            return any(genre_lower in g.lower() for g in genres)
-
-        mask = df['genres'].apply(has_genre)
-        df = df[mask]
-        df['vote_average'] = pd.to_numeric(df['vote_average'], errors='coerce').fillna(0)
-        df = df.sort_values(by='vote_average', ascending=False)
-        df = df.head(limit)
+        facets = self.facets
+        columns = [i for i, name in enumerate(facets['genre_names']) if genre_lower in name.lower()]
+        positions = np.flatnonzero(facets['genre_matrix'][:, columns].any(axis=1))
+        rating = np.nan_to_num(facets['vote_average'][positions])
+        order = np.argsort(-rating, kind='stable')[:limit]
+        df = self.movies_df.iloc[positions[order]].assign(vote_average=rating[order])
 
         movies = []
         for _, row in df.iterrows():
@@ -180,12 +366,14 @@ class MovieDataLoader:
                 'genres': self.get_genre_names(row.get('genres', '[]')),
                 'release_date': row.get('release_date', ''),
                 'vote_average': row.get('vote_average', 0),
-                'popularity': row.get('popularity', 0)
+                'popularity': row.get('popularity', 0),
+                'imdb_id': row.get('imdb_id')
             }
             movies.append(movie)
 
         return movies
 
+    @timed('pandas')
     def get_movie_by_id(self, movie_id):
         self.load_data()
         if self.movies_df is None:
@@ -214,23 +402,21 @@ class MovieDataLoader:
             'vote_count': row.get('vote_count', 0),
             'popularity': row.get('popularity', 0),
             'runtime': row.get('runtime', 0),
+            'imdb_id': row.get('imdb_id'),
             'cast': cast_info
         }
 
         return movie
 
+    @timed('pandas')
     def get_all_genres(self):
         self.load_data()
         if self.movies_df is None:
             return []
 
-        all_genres = set()
-        for genres_str in self.movies_df['genres'].dropna():
-            genres = self.get_genre_names(genres_str)
-            all_genres.update(genres)
-
-        return sorted(list(all_genres))
+        return list(self.facets['genre_names'])
 
+    @timed('pandas')
     def get_random_movies(self, count=10):
         self.load_data()
         if self.movies_df is None:
@@ -254,11 +440,108 @@ class MovieDataLoader:
                 'genres': self.get_genre_names(row.get('genres', '[]')),
                 'release_date': row.get('release_date', ''),
                 'vote_average': row.get('vote_average', 0),
-                'popularity': row.get('popularity', 0)
+                'popularity': row.get('popularity', 0),
+                'imdb_id': row.get('imdb_id')
             }
             movies.append(movie)
 
         return movies
 
+    @timed('pandas')
+    def discover(self, genres=None, year_min=None, year_max=None, runtime_min=None, runtime_max=None,
+                 rating_min=None, rating_max=None, votes_min=None, keyword=None, cast=None,
+                 sort='popularity', descending=True, limit=20, offset=0):
+        self.load_data()
+        if self.movies_df is None or self.facets is None:
+            return {'movies': [], 'total': 0, 'facets': {}}
+
+        facets = self.facets
+        mask = np.ones(len(self.movies_df), dtype=bool)
+
+        ranges = (
+            ('year', year_min, year_max),
+            ('runtime', runtime_min, runtime_max),
+            ('vote_average', rating_min, rating_max),
+            ('vote_count', votes_min, None),
+        )
+        for column, low, high in ranges:
+            # Comparisons against NaN are False, so rows missing a value
+            # drop out as soon as that column is filtered on.
+            if low is not None:
+                mask &= facets[column] >= low
+            if high is not None:
+                mask &= facets[column] <= high
+
+        if genres:
+            positions = {name.lower(): i for i, name in enumerate(facets['genre_names'])}
+            for genre in genres:
+                column = positions.get(genre.lower())
+                if column is None:
+                    mask[:] = False
+                    break
+                mask &= facets['genre_matrix'][:, column]
+
+        for term, codes_key, index_key in ((keyword, 'keyword_codes', 'keyword_index'),
+                                           (cast, 'cast_codes', 'cast_index')):
+            if not term:
+                continue
+            term = term.lower()
+            matches = [codes for name, codes in facets[index_key].items() if term in name]
+            if matches:
+                mask &= np.isin(facets[codes_key], np.concatenate(matches))
+            else:
+                mask[:] = False
+
+        positions = np.flatnonzero(mask)
+        total = len(positions)
+
+        years = facets['year'][positions]
+        years = years[~np.isnan(years)]
+        decades, decade_counts = np.unique((years // 10 * 10).astype(int), return_counts=True)
+        ratings = facets['vote_average'][positions]
+        ratings = ratings[~np.isnan(ratings)]
+        rating_counts = np.bincount(np.clip(ratings, 0, 10).astype(int), minlength=11)
+        result_facets = {
+            'genres': {
+                name: int(count)
+                for name, count in zip(facets['genre_names'], facets['genre_matrix'][positions].sum(axis=0))
+                if count
+            },
+            'decades': {f"{d}s": int(c) for d, c in zip(decades, decade_counts)},
+            'ratings': {str(r): int(c) for r, c in enumerate(rating_counts) if c},
+        }
+
+        if sort not in FACET_NUMERIC_COLUMNS:
+            sort = 'popularity'
+        values = facets[sort][positions]
+        # Missing values sort last in either direction.
+        values = np.where(np.isnan(values), np.inf, -values if descending else values)
+        end = min(offset + limit, total)
+        if end <= 0 or offset >= total:
+            order = np.array([], dtype=int)
+        elif end < total:
+            order = np.argpartition(values, end - 1)[:end]
+            order = order[np.argsort(values[order], kind='stable')][offset:]
+        else:
+            order = np.argsort(values, kind='stable')[offset:end]
+
+        movies = []
+        for _, row in self.movies_df.iloc[positions[order]].iterrows():
+            movie = {
+                'id': row.get('id'),
+                'title': row.get('title', row.get('original_title', 'Unknown')),
+                'overview': row.get('overview', ''),
+                'genres': self.get_genre_names(row.get('genres', '[]')),
+                'release_date': row.get('release_date', ''),
+                'vote_average': row.get('vote_average', 0),
+                'vote_count': row.get('vote_count', 0),
+                'popularity': row.get('popularity', 0),
+                'runtime': row.get('runtime', 0),
+                'imdb_id': row.get('imdb_id')
+            }
+            movies.append(movie)
+
+        return {'movies': movies, 'total': total, 'facets': result_facets}
+
 
 movie_loader = MovieDataLoader()
@@ -1,15 +1,74 @@
+import asyncio
+import itertools
 import os
 import requests
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from flask import has_request_context
+
+import async_runtime
+import metrics
+from write_behind import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
 OMDB_API_KEY = os.environ.get("OMDB_API_KEY")
-OMDB_BASE_URL = "http://www.omdbapi.com/"
+OMDB_BASE_URL = os.environ.get("OMDB_BASE_URL", "http://www.omdbapi.com/")
+# Serve only what is already cached (e.g. an imported snapshot): entries
+# never go stale and nothing is requested from OMDb.
+OMDB_OFFLINE = os.environ.get("OMDB_OFFLINE", "0") == "1"
 
 _cache = {}
+_cache_lock = threading.Lock()
+# Each entry carries a version that changes with its data, so rendered pages
+# built from it know when to rebuild (see cache_versions()).
+_cache_versions = itertools.count(1)
 CACHE_DURATION_HOURS = 24
+# Entries older than the TTL are still served while a background refresh
+# runs. Past this limit they are dropped from memory; the database copy (e.g.
+# from an old imported snapshot) is then served as stale once more while it
+# is refreshed, rather than fetched on the request path.
+CACHE_MAX_STALE_HOURS = float(os.environ.get("OMDB_CACHE_MAX_STALE_HOURS", 24 * 7))
+# Spread expiry by +/- this fraction of the TTL so that entries written in
+# the same burst do not all go stale together.
+CACHE_JITTER_FRACTION = 0.1
+
+# Outbound request priorities, most important first. When the rate limit or
+# daily quota runs low, lower priorities give up (no poster) instead of
+# waiting, leaving the remaining budget to the hero and visible cards.
+PRIORITY_HERO = 0
+PRIORITY_VISIBLE = 1
+PRIORITY_BELOW_FOLD = 2
+PRIORITY_PREWARM = 3
+
+OMDB_RATE_PER_SECOND = float(os.environ.get("OMDB_RATE_PER_SECOND", 5))
+OMDB_BURST = int(os.environ.get("OMDB_BURST", 10))
+OMDB_DAILY_QUOTA = int(os.environ.get("OMDB_DAILY_QUOTA", 1000))
+# Fraction of the burst and of the daily quota that must still be left for
+# a request of each priority to go out.
+PRIORITY_RESERVE = {
+    PRIORITY_HERO: 0.0,
+    PRIORITY_VISIBLE: 0.1,
+    PRIORITY_BELOW_FOLD: 0.3,
+    PRIORITY_PREWARM: 0.5,
+}
+# How long a request of each priority may wait for a rate-limit token.
+PRIORITY_MAX_WAIT = {
+    PRIORITY_HERO: 2.0,
+    PRIORITY_VISIBLE: 0.5,
+    PRIORITY_BELOW_FOLD: 0.0,
+    PRIORITY_PREWARM: 0.0,
+}
+
+REFRESH_WORKERS = 2
+REFRESH_RETRY_MINUTES = 15
+_refresh_executor = None
+_refresh_attempts = {}
 
 
 def _get_cache_key(title=None, imdb_id=None):
@@ -20,56 +79,150 @@ def _get_cache_key(title=None, imdb_id=None):
     return None
 
 
+def _cache_ttl(key):
+    spread = (zlib.crc32(key.encode('utf-8')) % 1000) / 999
+    jitter = CACHE_JITTER_FRACTION * (2 * spread - 1)
+    return timedelta(hours=CACHE_DURATION_HOURS * (1 + jitter))
+
+
+def _cache_state(key, cached_at):
+    if OMDB_OFFLINE:
+        return 'fresh'
+    age = datetime.utcnow() - cached_at
+    if age < _cache_ttl(key):
+        return 'fresh'
+    if age < timedelta(hours=CACHE_MAX_STALE_HOURS):
+        return 'stale'
+    return 'expired'
+
+
 def _get_from_cache(key):
-    if key in _cache:
-        entry = _cache[key]
-        if datetime.now() - entry['timestamp'] < timedelta(hours=CACHE_DURATION_HOURS):
-            logger.debug(f"Cache hit for {key}")
-            return entry['data']
-        else:
-            del _cache[key]
-    return None
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is None:
+        metrics.cache_lookup('omdb_memory', hit=False)
+        return None
 
+    state = _cache_state(key, entry['timestamp'])
+    if state == 'expired':
+        with _cache_lock:
+            if _cache.get(key) is entry:
+                del _cache[key]
+        metrics.cache_lookup('omdb_memory', hit=False)
+        return None
+
+    metrics.cache_lookup('omdb_memory', hit=True)
+    logger.debug(f"Cache hit for {key} ({state})")
+    return {'data': entry['data'], 'stale': state == 'stale'}
+
+
+def _save_to_cache(key, data, timestamp=None):
+    with _cache_lock:
+        previous = _cache.get(key)
+        same = previous is not None and previous['data'] == data
+        _cache[key] = {
+            'data': data,
+            'timestamp': timestamp or datetime.utcnow(),
+            'version': previous['version'] if same else next(_cache_versions)
+        }
 
-def _save_to_cache(key, data):
-    _cache[key] = {
-        'data': data,
-        'timestamp': datetime.now()
+
+def cache_key(title=None, imdb_id=None):
+    return _get_cache_key(title=title, imdb_id=imdb_id)
+
+
+def cache_versions(keys):
+    """Map each cache key to a token that changes whenever the in-memory
+    entry's data does, or it goes stale or expires (None when absent)."""
+    with _cache_lock:
+        entries = {key: _cache.get(key) for key in keys}
+    return {
+        key: None if entry is None else (entry['version'], _cache_state(key, entry['timestamp']))
+        for key, entry in entries.items()
     }
 
 
-def _save_to_db_cache(title, imdb_id, data):
+def _note_lookup(cache_key):
+    # Pages and fragments cached for this request depend on the entry.
+    if cache_key and has_request_context():
+        from response_cache import add_dependencies
+
+        add_dependencies([cache_key])
+
+
+def _schedule_refresh(cache_key, title=None, imdb_id=None):
+    global _refresh_executor
+
+    now = datetime.utcnow()
+    with _cache_lock:
+        last_attempt = _refresh_attempts.get(cache_key)
+        if last_attempt and now - last_attempt < timedelta(minutes=REFRESH_RETRY_MINUTES):
+            return
+        _refresh_attempts[cache_key] = now
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS,
+                                                   thread_name_prefix='omdb-refresh')
+
+    logger.debug(f"Scheduling background refresh for {cache_key}")
+    _refresh_executor.submit(_refresh_entry, cache_key, title, imdb_id)
+
+
+def _refresh_entry(cache_key, title=None, imdb_id=None):
     try:
-        from app import app, db
-        from models import OMDbCache
+        result = _fetch_movie_details(title=title, imdb_id=imdb_id, cache_key=cache_key,
+                                      cache_misses=False, priority=PRIORITY_PREWARM)
+        if result is not None and result is not _THROTTLED:
+            with _cache_lock:
+                _refresh_attempts.pop(cache_key, None)
+    except Exception as e:
+        metrics.upstream_error('omdb')
+        logger.warning(f"Background refresh failed for {cache_key}, serving stale entry: {e}")
 
-        with app.app_context():
-            cache_key = imdb_id if imdb_id else title
-            existing = OMDbCache.query.filter_by(cache_key=cache_key).first()
-
-            if existing:
-                existing.poster_url = data.get('poster') if data else None
-                existing.imdb_rating = data.get('imdb_rating') if data else None
-                existing.director = data.get('director') if data else None
-                existing.actors = data.get('actors') if data else None
-                existing.awards = data.get('awards') if data else None
-                existing.cached_at = datetime.utcnow()
-            else:
-                cache_entry = OMDbCache(
-                    cache_key=cache_key,
-                    title=title,
-                    imdb_id=imdb_id,
-                    poster_url=data.get('poster') if data else None,
-                    imdb_rating=data.get('imdb_rating') if data else None,
-                    director=data.get('director') if data else None,
-                    actors=data.get('actors') if data else None,
-                    awards=data.get('awards') if data else None
-                )
-                db.session.add(cache_entry)
 
+def _save_to_db_cache(title, imdb_id, data):
+    cache_key = imdb_id if imdb_id else title
+    if not cache_key:
+        return
+    _db_writer.put({
+        'cache_key': cache_key,
+        'title': title,
+        'imdb_id': imdb_id,
+        'poster_url': data.get('poster') if data else None,
+        'imdb_rating': data.get('imdb_rating') if data else None,
+        'director': data.get('director') if data else None,
+        'actors': data.get('actors') if data else None,
+        'awards': data.get('awards') if data else None,
+        'cached_at': datetime.utcnow()
+    })
+
+
+def _flush_db_cache(rows):
+    from app import app, db
+    from omdb_snapshot import upsert_statement
+
+    latest = {}
+    for row in rows:
+        latest[row['cache_key']] = row
+
+    with app.app_context(), metrics.span('postgres'):
+        # A single upsert, so another worker caching the same new key can't
+        # make the whole batch fail on the unique constraint.
+        try:
+            db.session.execute(upsert_statement(list(latest.values())))
             db.session.commit()
-    except Exception as e:
-        logger.debug(f"Could not save to DB cache: {e}")
+        except Exception:
+            db.session.rollback()
+            raise
+    logger.debug(f"Flushed {len(latest)} OMDb cache entries to DB")
+
+
+_db_writer = WriteBehindQueue(
+    'omdb-cache',
+    _flush_db_cache,
+    batch_size=int(os.environ.get("OMDB_CACHE_WRITE_BATCH", 50)),
+    flush_interval_ms=int(os.environ.get("OMDB_CACHE_WRITE_INTERVAL_MS", 500)),
+    max_size=int(os.environ.get("OMDB_CACHE_WRITE_QUEUE_SIZE", 5000))
+)
 
 
 def _get_from_db_cache(title=None, imdb_id=None):
@@ -82,12 +235,19 @@ def _get_from_db_cache(title=None, imdb_id=None):
             if not cache_key:
                 return None
 
-            entry = OMDbCache.query.filter_by(cache_key=cache_key).first()
-            if entry:
-                cache_age = datetime.utcnow() - entry.cached_at
-                if cache_age < timedelta(hours=CACHE_DURATION_HOURS):
-                    logger.debug(f"DB cache hit for {cache_key}")
-                    return {
+            with metrics.span('postgres'):
+                entry = OMDbCache.query.filter_by(cache_key=cache_key).first()
+            if entry and entry.cached_at:
+                state = _cache_state(cache_key, entry.cached_at)
+                cached_at = entry.cached_at
+                if state == 'expired':
+                    # Keep it in memory as just gone stale, so it is served
+                    # until the background refresh replaces it.
+                    cached_at = datetime.utcnow() - _cache_ttl(cache_key)
+                logger.debug(f"DB cache hit for {cache_key} ({state})")
+                metrics.cache_lookup('omdb_db', hit=True)
+                return {
+                    'data': {
                         'title': entry.title,
                         'poster': entry.poster_url,
                         'imdb_rating': entry.imdb_rating,
@@ -95,87 +255,390 @@ def _get_from_db_cache(title=None, imdb_id=None):
                         'actors': entry.actors,
                         'awards': entry.awards,
                         'imdb_id': entry.imdb_id
-                    }
+                    },
+                    'stale': state != 'fresh',
+                    'cached_at': cached_at
+                }
     except Exception as e:
         logger.debug(f"Could not read from DB cache: {e}")
+    metrics.cache_lookup('omdb_db', hit=False)
     return None
 
 
-def get_movie_details(title=None, imdb_id=None):
-    cache_key = _get_cache_key(title=title, imdb_id=imdb_id)
+class OutboundScheduler:
+    """Token-bucket rate limit plus daily quota accounting for OMDb calls.
+
+    Usage is counted locally, persisted to ``omdb_quota`` in batches and
+    re-read from the table after each flush, so workers sharing a key see
+    each other's consumption.
+    """
+
+    def __init__(self, rate, burst, daily_quota):
+        self.rate = rate
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self.tokens = float(burst)
+        self.stats = {'granted': 0, 'rate_limited': 0, 'quota_exhausted': 0}
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._day = None
+        self._used = 0
+        self._unflushed = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _roll_day(self):
+        today = date.today()
+        if self._day != today:
+            self._day = today
+            self._used = _load_quota_usage(today) + self._unflushed
+
+    def remaining(self):
+        with self._lock:
+            self._roll_day()
+            return max(self.daily_quota - self._used, 0)
+
+    def try_acquire(self, priority):
+        """Take a token if the budget allows; returns seconds to wait otherwise,
+        or None when the daily quota rules the request out."""
+        reserve = PRIORITY_RESERVE.get(priority, PRIORITY_RESERVE[PRIORITY_PREWARM])
+        with self._lock:
+            self._roll_day()
+            if self.daily_quota - self._used <= self.daily_quota * reserve:
+                self.stats['quota_exhausted'] += 1
+                return None
 
-    if cache_key:
-        cached = _get_from_cache(cache_key)
-        if cached is not None:
-            return cached
+            now = time.monotonic()
+            self._refill(now)
+            needed = 1 + self.burst * reserve
+            if self.tokens < needed:
+                return (needed - self.tokens) / self.rate if self.rate else None
+
+            self.tokens -= 1
+            self._used += 1
+            self._unflushed += 1
+            self.stats['granted'] += 1
+            day = self._day
+
+        _quota_writer.put({'day': day, 'count': 1})
+        return 0
+
+    def acquire(self, priority):
+        deadline = time.monotonic() + PRIORITY_MAX_WAIT.get(priority, 0.0)
+        while True:
+            wait = self.try_acquire(priority)
+            if wait == 0:
+                return True
+            if wait is None or time.monotonic() + wait > deadline:
+                if wait is not None:
+                    self.stats['rate_limited'] += 1
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, priority):
+        deadline = time.monotonic() + PRIORITY_MAX_WAIT.get(priority, 0.0)
+        while True:
+            wait = self.try_acquire(priority)
+            if wait == 0:
+                return True
+            if wait is None or time.monotonic() + wait > deadline:
+                if wait is not None:
+                    self.stats['rate_limited'] += 1
+                return False
+            await asyncio.sleep(wait)
+
+    def usage_flushed(self, day, count, total):
+        with self._lock:
+            self._unflushed = max(self._unflushed - count, 0)
+            if day == self._day and total is not None:
+                self._used = total + self._unflushed
+
+
+def _load_quota_usage(day):
+    try:
+        from app import app, db
+        from models import OMDbQuota
 
-        db_cached = _get_from_db_cache(title=title, imdb_id=imdb_id)
-        if db_cached:
-            _save_to_cache(cache_key, db_cached)
-            return db_cached
+        with app.app_context(), metrics.span('postgres'):
+            entry = db.session.get(OMDbQuota, day)
+            return entry.used if entry else 0
+    except Exception as e:
+        logger.debug(f"Could not read OMDb quota usage: {e}")
+        return 0
 
-    try:
-        params = {
-            'apikey': OMDB_API_KEY,
-            'plot': 'short'
+
+def _flush_quota_usage(rows):
+    from app import app, db
+    from models import OMDbQuota
+
+    per_day = {}
+    for row in rows:
+        per_day[row['day']] = per_day.get(row['day'], 0) + row['count']
+
+    with app.app_context(), metrics.span('postgres'):
+        for day, count in per_day.items():
+            try:
+                updated = (OMDbQuota.query.filter_by(day=day)
+                           .update({OMDbQuota.used: OMDbQuota.used + count}))
+                if not updated:
+                    db.session.add(OMDbQuota(day=day, used=count))
+                db.session.commit()
+            except Exception:
+                # Another worker may have inserted the row first.
+                db.session.rollback()
+                OMDbQuota.query.filter_by(day=day).update({OMDbQuota.used: OMDbQuota.used + count})
+                db.session.commit()
+
+            entry = db.session.get(OMDbQuota, day)
+            _scheduler.usage_flushed(day, count, entry.used if entry else None)
+
+
+_quota_writer = WriteBehindQueue('omdb-quota', _flush_quota_usage, batch_size=50, flush_interval_ms=1000)
+_scheduler = OutboundScheduler(OMDB_RATE_PER_SECOND, OMDB_BURST, OMDB_DAILY_QUOTA)
+metrics.register_gauge('cinemood_omdb_quota_remaining', _scheduler.remaining)
+
+
+def quota_remaining():
+    return _scheduler.remaining()
+
+
+_MISSING = object()
+# Returned by the fetchers when the scheduler refused the lookup, so callers
+# can tell "not on OMDb" (None) apart from "not asked".
+_THROTTLED = object()
+
+
+def _unthrottled(result, cache_key):
+    """Map _THROTTLED to None. Whatever is rendered from the refused lookup
+    is incomplete, so note the key to keep it out of the response caches."""
+    if result is not _THROTTLED:
+        return result
+    if cache_key and has_request_context():
+        from response_cache import add_throttled
+
+        add_throttled([cache_key])
+    return None
+
+
+def _details_params(title=None, imdb_id=None):
+    params = {
+        'apikey': OMDB_API_KEY,
+        'plot': 'short'
+    }
+
+    if imdb_id:
+        params['i'] = f"tt{imdb_id}" if not str(imdb_id).startswith('tt') else imdb_id
+    elif title:
+        params['t'] = title
+    else:
+        return None
+    return params
+
+
+def _store_details(data, title=None, imdb_id=None, cache_key=None, cache_misses=True):
+    if data.get('Response') == 'True':
+        result = {
+            'title': data.get('Title'),
+            'year': data.get('Year'),
+            'rated': data.get('Rated'),
+            'runtime': data.get('Runtime'),
+            'genre': data.get('Genre'),
+            'director': data.get('Director'),
+            'actors': data.get('Actors'),
+            'plot': data.get('Plot'),
+            'poster': data.get('Poster') if data.get('Poster') != 'N/A' else None,
+            'imdb_rating': data.get('imdbRating'),
+            'imdb_id': data.get('imdbID'),
+            'box_office': data.get('BoxOffice'),
+            'awards': data.get('Awards')
         }
 
-        if imdb_id:
-            params['i'] = f"tt{imdb_id}" if not str(imdb_id).startswith('tt') else imdb_id
-        elif title:
-            params['t'] = title
-        else:
-            return None
+        if cache_key:
+            _save_to_cache(cache_key, result)
+        _save_to_db_cache(title or result.get('title'), imdb_id, result)
+
+        return result
+    else:
+        logger.debug(f"Movie not found: {title or imdb_id}")
+        if cache_key and cache_misses:
+            _save_to_cache(cache_key, None)
+        return None
+
+
+def _fetch_movie_details(title=None, imdb_id=None, cache_key=None, cache_misses=True,
+                         priority=PRIORITY_VISIBLE):
+    params = _details_params(title=title, imdb_id=imdb_id)
+    if params is None or OMDB_OFFLINE:
+        return None
 
+    if not _scheduler.acquire(priority):
+        metrics.inc('cinemood_omdb_throttled_total', priority=priority)
+        logger.debug(f"OMDb budget too low for priority {priority}, skipping {title or imdb_id}")
+        return _THROTTLED
+
+    with metrics.span('omdb'):
         response = requests.get(OMDB_BASE_URL, params=params, timeout=5)
         response.raise_for_status()
-
         data = response.json()
 
-        if data.get('Response') == 'True':
-            result = {
-                'title': data.get('Title'),
-                'year': data.get('Year'),
-                'rated': data.get('Rated'),
-                'runtime': data.get('Runtime'),
-                'genre': data.get('Genre'),
-                'director': data.get('Director'),
-                'actors': data.get('Actors'),
-                'plot': data.get('Plot'),
-                'poster': data.get('Poster') if data.get('Poster') != 'N/A' else None,
-                'imdb_rating': data.get('imdbRating'),
-                'imdb_id': data.get('imdbID'),
-                'box_office': data.get('BoxOffice'),
-                'awards': data.get('Awards')
-            }
-
-            if cache_key:
-                _save_to_cache(cache_key, result)
-            _save_to_db_cache(title, imdb_id, result)
-
-            return result
-        else:
-            logger.debug(f"Movie not found: {title or imdb_id}")
-            if cache_key:
-                _save_to_cache(cache_key, None)
-            return None
+    return _store_details(data, title=title, imdb_id=imdb_id, cache_key=cache_key,
+                          cache_misses=cache_misses)
+
+
+def _from_memory_cache(cache_key, title=None, imdb_id=None):
+    cached = _get_from_cache(cache_key)
+    if cached is None:
+        return _MISSING
+    if cached['stale']:
+        _schedule_refresh(cache_key, title=title, imdb_id=imdb_id)
+    return cached['data']
+
+
+def _from_db_cache(cache_key, title=None, imdb_id=None):
+    db_cached = _get_from_db_cache(title=title, imdb_id=imdb_id)
+    if not db_cached:
+        return _MISSING
+    _save_to_cache(cache_key, db_cached['data'], timestamp=db_cached['cached_at'])
+    if db_cached['stale']:
+        _schedule_refresh(cache_key, title=title, imdb_id=imdb_id)
+    return db_cached['data']
+
 
+def get_movie_details(title=None, imdb_id=None, priority=PRIORITY_VISIBLE):
+    cache_key = _get_cache_key(title=title, imdb_id=imdb_id)
+    _note_lookup(cache_key)
+
+    if cache_key:
+        for lookup in (_from_memory_cache, _from_db_cache):
+            cached = lookup(cache_key, title=title, imdb_id=imdb_id)
+            if cached is not _MISSING:
+                return cached
+
+    try:
+        result = _fetch_movie_details(title=title, imdb_id=imdb_id, cache_key=cache_key,
+                                      priority=priority)
+        return _unthrottled(result, cache_key)
     except requests.exceptions.RequestException as e:
+        metrics.upstream_error('omdb')
         logger.error(f"Error fetching from OMDb: {e}")
         return None
     except Exception as e:
+        metrics.upstream_error('omdb')
         logger.error(f"Unexpected error in get_movie_details: {e}")
         return None
 
 
-def get_poster_url(title=None, imdb_id=None):
-    details = get_movie_details(title=title, imdb_id=imdb_id)
+def get_poster_url(title=None, imdb_id=None, priority=PRIORITY_VISIBLE):
+    details = get_movie_details(title=title, imdb_id=imdb_id, priority=priority)
     if details and details.get('poster'):
         return details['poster']
     return None
 
 
-def search_movies_omdb(query, limit=10):
+# Async variants. These run on the shared loop from async_runtime; cache
+# reads that touch the database are pushed to a thread, live lookups use an
+# httpx client when available and concurrent misses for the same key share
+# a single request.
+_async_client = None
+_async_client_loop = None
+_inflight = {}
+
+
+def _get_async_client():
+    global _async_client, _async_client_loop
+
+    try:
+        import httpx
+    except ImportError:
+        return None
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(timeout=5,
+                                          limits=httpx.Limits(max_connections=100,
+                                                              max_keepalive_connections=20))
+        _async_client_loop = loop
+    return _async_client
+
+
+def _get_json(params):
+    response = requests.get(OMDB_BASE_URL, params=params, timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _fetch_movie_details_async(title=None, imdb_id=None, cache_key=None, priority=PRIORITY_VISIBLE):
+    params = _details_params(title=title, imdb_id=imdb_id)
+    if params is None or OMDB_OFFLINE:
+        return None
+
+    if not await _scheduler.acquire_async(priority):
+        metrics.inc('cinemood_omdb_throttled_total', priority=priority)
+        logger.debug(f"OMDb budget too low for priority {priority}, skipping {title or imdb_id}")
+        return _THROTTLED
+
+    with metrics.span('omdb'):
+        client = _get_async_client()
+        if client is None:
+            data = await asyncio.to_thread(_get_json, params)
+        else:
+            response = await client.get(OMDB_BASE_URL, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+    return _store_details(data, title=title, imdb_id=imdb_id, cache_key=cache_key)
+
+
+async def get_movie_details_async(title=None, imdb_id=None, priority=PRIORITY_VISIBLE):
+    cache_key = _get_cache_key(title=title, imdb_id=imdb_id)
+    _note_lookup(cache_key)
+
+    if cache_key:
+        cached = _from_memory_cache(cache_key, title=title, imdb_id=imdb_id)
+        if cached is not _MISSING:
+            return cached
+        cached = await async_runtime.run_db(_from_db_cache, cache_key, title=title, imdb_id=imdb_id)
+        if cached is not _MISSING:
+            return cached
+
+    inflight_key = cache_key or (title, imdb_id)
+    inflight = _inflight.get(inflight_key)
+    if inflight is None:
+        task = asyncio.ensure_future(_fetch_movie_details_async(
+            title=title, imdb_id=imdb_id, cache_key=cache_key, priority=priority))
+        inflight = _inflight[inflight_key] = (task, priority)
+        task.add_done_callback(lambda _: _inflight.pop(inflight_key, None))
+    task, task_priority = inflight
+
+    try:
+        result = await asyncio.shield(task)
+        if result is _THROTTLED and priority < task_priority:
+            # The shared lookup was refused at its lower priority; ours may
+            # still be within budget.
+            result = await _fetch_movie_details_async(title=title, imdb_id=imdb_id, cache_key=cache_key,
+                                                      priority=priority)
+        return _unthrottled(result, cache_key)
+    except Exception as e:
+        metrics.upstream_error('omdb')
+        logger.error(f"Error fetching from OMDb: {e}")
+        return None
+
+
+async def get_poster_url_async(title=None, imdb_id=None, priority=PRIORITY_VISIBLE):
+    details = await get_movie_details_async(title=title, imdb_id=imdb_id, priority=priority)
+    if details and details.get('poster'):
+        return details['poster']
+    return None
+
+
+def search_movies_omdb(query, limit=10, priority=PRIORITY_VISIBLE):
+    if OMDB_OFFLINE:
+        return []
+    if not _scheduler.acquire(priority):
+        metrics.inc('cinemood_omdb_throttled_total', priority=priority)
+        return []
+
     try:
         params = {
             'apikey': OMDB_API_KEY,
@@ -183,10 +646,10 @@ def search_movies_omdb(query, limit=10):
             'type': 'movie'
         }
 
-        response = requests.get(OMDB_BASE_URL, params=params, timeout=5)
-        response.raise_for_status()
-
-        data = response.json()
+        with metrics.span('omdb'):
+            response = requests.get(OMDB_BASE_URL, params=params, timeout=5)
+            response.raise_for_status()
+            data = response.json()
 
         if data.get('Response') == 'True':
             movies = []
@@ -202,16 +665,42 @@ def search_movies_omdb(query, limit=10):
             return []
 
     except Exception as e:
+        metrics.upstream_error('omdb')
         logger.error(f"Error searching OMDb: {e}")
         return []
 
 
-def enrich_movie_with_omdb(movie):
+def enrich_movie_with_omdb(movie, priority=PRIORITY_HERO):
     title = movie.get('title')
-    if not title:
+    imdb_id = movie.get('imdb_id')
+    if not title and not imdb_id:
         return movie
 
-    omdb_data = get_movie_details(title=title)
+    if imdb_id:
+        omdb_data = get_movie_details(imdb_id=imdb_id, priority=priority)
+    else:
+        omdb_data = get_movie_details(title=title, priority=priority)
+
+    if omdb_data:
+        movie['poster_url'] = omdb_data.get('poster')
+        movie['imdb_rating'] = omdb_data.get('imdb_rating')
+        movie['director'] = omdb_data.get('director')
+        movie['actors'] = omdb_data.get('actors')
+        movie['awards'] = omdb_data.get('awards')
+
+    return movie
+
+
+async def enrich_movie_with_omdb_async(movie, priority=PRIORITY_HERO):
+    title = movie.get('title')
+    imdb_id = movie.get('imdb_id')
+    if not title and not imdb_id:
+        return movie
+
+    if imdb_id:
+        omdb_data = await get_movie_details_async(imdb_id=imdb_id, priority=priority)
+    else:
+        omdb_data = await get_movie_details_async(title=title, priority=priority)
 
     if omdb_data:
         movie['poster_url'] = omdb_data.get('poster')
@@ -0,0 +1,160 @@
+import gzip
+import json
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_BATCH_SIZE = 1000
+SNAPSHOT_COLUMNS = ('cache_key', 'title', 'imdb_id', 'poster_url', 'imdb_rating', 'director', 'actors',
+                    'awards', 'cached_at')
+
+
+def _is_parquet(path):
+    return path.endswith('.parquet')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Parquet snapshots need pyarrow (pip install pyarrow); "
+                           "use a .jsonl.gz file instead")
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([(column, pa.timestamp('us') if column == 'cached_at' else pa.string())
+                      for column in SNAPSHOT_COLUMNS])
+
+
+def _iter_cache_rows(batch_size):
+    from app import db
+    from models import OMDbCache
+
+    table = OMDbCache.__table__
+    columns = [table.c[column] for column in SNAPSHOT_COLUMNS]
+    last_id = 0
+    while True:
+        # Keyset pagination keeps memory flat and works the same on every
+        # backend, unlike server-side cursors.
+        rows = db.session.execute(
+            db.select(table.c.id, *columns)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield [{column: row._mapping[column] for column in SNAPSHOT_COLUMNS} for row in rows]
+
+
+def export_cache(path, batch_size=SNAPSHOT_BATCH_SIZE):
+    """Write every OMDbCache row to ``path`` (``.parquet`` or gzip JSONL).
+
+    Must be called inside an app context. Returns the number of rows written.
+    """
+    count = 0
+    if _is_parquet(path):
+        _require_pyarrow()
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _parquet_schema()
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            for batch in _iter_cache_rows(batch_size):
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+    else:
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            for batch in _iter_cache_rows(batch_size):
+                for row in batch:
+                    if row['cached_at'] is not None:
+                        row['cached_at'] = row['cached_at'].isoformat()
+                    f.write(json.dumps(row) + '\n')
+                count += len(batch)
+
+    logger.info(f"Exported {count} OMDb cache entries to {path}")
+    return count
+
+
+def _read_batches(path, batch_size):
+    if _is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=list(SNAPSHOT_COLUMNS)):
+            yield batch.to_pylist()
+        return
+
+    batch = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get('cached_at'):
+                row['cached_at'] = datetime.fromisoformat(row['cached_at'])
+            batch.append({column: row.get(column) for column in SNAPSHOT_COLUMNS})
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def upsert_statement(rows, overwrite_newer=False):
+    """Insert-or-update ``rows`` of OMDbCache by ``cache_key`` in one statement."""
+    from app import db
+    from models import OMDbCache
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Bulk OMDb cache import is not supported on {dialect}")
+
+    table = OMDbCache.__table__
+    statement = insert(table).values(rows)
+    where = None
+    if not overwrite_newer:
+        # Never replace an entry fetched more recently than the snapshot.
+        where = db.or_(table.c.cached_at.is_(None), table.c.cached_at < statement.excluded.cached_at)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.cache_key],
+        set_={column: statement.excluded[column] for column in SNAPSHOT_COLUMNS if column != 'cache_key'},
+        where=where
+    )
+
+
+def import_cache(path, batch_size=SNAPSHOT_BATCH_SIZE, overwrite_newer=False):
+    """Upsert the rows of a snapshot written by ``export_cache``, keeping
+    their original ``cached_at``. Must be called inside an app context.
+    Returns the number of rows read.
+    """
+    from app import db
+
+    count = 0
+    for batch in _read_batches(path, batch_size):
+        # A key repeated within one statement makes Postgres reject the upsert.
+        latest = {}
+        for row in batch:
+            if row['cache_key']:
+                latest[row['cache_key']] = row
+        if not latest:
+            continue
+        try:
+            db.session.execute(upsert_statement(list(latest.values()), overwrite_newer))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        count += len(latest)
+        logger.debug(f"Imported {count} OMDb cache entries so far")
+
+    logger.info(f"Imported {count} OMDb cache entries from {path}")
+    return count
@@ -2,20 +2,49 @@ import os
 import json
 import logging
 import random
+import threading
+
+import metrics
 
 logger = logging.getLogger(__name__)
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
 openai_client = None
+async_openai_client = None
+_clients_initialized = False
+_clients_lock = threading.Lock()
 
-if OPENAI_API_KEY:
-    try:
-        from openai import OpenAI
-        openai_client = OpenAI(api_key=OPENAI_API_KEY)
-        logger.info("OpenAI client initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize OpenAI client: {e}")
+
+def init_clients():
+    # The openai package is slow to import, so the clients are built on
+    # first use (or by warmup) rather than when this module is imported.
+    global openai_client, async_openai_client, _clients_initialized
+
+    if _clients_initialized:
+        return
+    with _clients_lock:
+        if _clients_initialized:
+            return
+        if OPENAI_API_KEY:
+            try:
+                from openai import AsyncOpenAI, OpenAI
+                openai_client = OpenAI(api_key=OPENAI_API_KEY)
+                async_openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+                logger.info("OpenAI client initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize OpenAI client: {e}")
+        _clients_initialized = True
+
+
+def _get_client():
+    init_clients()
+    return openai_client
+
+
+def _get_async_client():
+    init_clients()
+    return async_openai_client
 
 
 def get_diverse_movie_sample(available_movies, sample_size=200):
@@ -44,21 +73,16 @@ def get_diverse_movie_sample(available_movies, sample_size=200):
     return diverse_sample[:sample_size]
 
 
-def get_mood_based_recommendations(mood, available_movies, limit=10):
-    if not openai_client:
-        return get_fallback_mood_recommendations(mood, available_movies, limit)
-
-    try:
-        diverse_movies = get_diverse_movie_sample(available_movies, sample_size=200)
-        movie_data = []
-        for m in diverse_movies[:100]:
-            movie_data.append({
-                'title': m.get('title', ''),
-                'genres': m.get('genres', []),
-                'rating': m.get('vote_average', 0)
-            })
+def _mood_request(mood, diverse_movies, limit):
+    movie_data = []
+    for m in diverse_movies[:100]:
+        movie_data.append({
+            'title': m.get('title', ''),
+            'genres': m.get('genres', []),
+            'rating': m.get('vote_average', 0)
+        })
 
-        prompt = f"""Based on the user's mood: "{mood}", recommend the best movies from this list.
+    prompt = f"""Based on the user's mood: "{mood}", recommend the best movies from this list.
         
 Available movies: {json.dumps(movie_data[:50])}
 
@@ -67,92 +91,141 @@ Return a JSON object with this exact format:
 
 Select up to {limit} movies that best match the mood. Only include movies from the provided list."""
 
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a movie recommendation expert. You understand human emotions and can suggest movies that match different moods. Always respond with valid JSON."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=1024
-        )
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a movie recommendation expert. You understand human emotions and can suggest movies that match different moods. Always respond with valid JSON."
+            },
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=1024
+    )
 
-        result = json.loads(response.choices[0].message.content)
-        recommended_titles = result.get('recommendations', [])
 
-        recommended_movies = []
-        for movie in diverse_movies:
-            if movie.get('title') in recommended_titles:
+def _genre_request(genre, diverse_movies, limit):
+    movies_data = []
+    for m in diverse_movies[:100]:
+        movies_data.append({
+            'title': m.get('title', ''),
+            'genres': m.get('genres', []),
+            'rating': m.get('vote_average', 0)
+        })
+
+    prompt = f"""The user wants to watch movies in the "{genre}" genre.
+        
+Available movies with their genres: {json.dumps(movies_data[:50])}
+
+Return a JSON object with this exact format:
+{{"recommendations": ["Movie Title 1", "Movie Title 2", "Movie Title 3", ...], "reason": "Brief explanation of the selection"}}
+
+Select up to {limit} movies that best match the requested genre. Prioritize higher-rated movies. Only include movies from the provided list."""
+
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a movie recommendation expert. Help users find the best movies in their preferred genres. Always respond with valid JSON."
+            },
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=1024
+    )
+
+
+def _pick_recommendations(response, diverse_movies, limit, with_reason=False):
+    result = json.loads(response.choices[0].message.content)
+    recommended_titles = result.get('recommendations', [])
+
+    recommended_movies = []
+    for movie in diverse_movies:
+        if movie.get('title') in recommended_titles:
+            if with_reason:
                 movie['recommendation_reason'] = result.get('reason', '')
-                recommended_movies.append(movie)
-                if len(recommended_movies) >= limit:
-                    break
+            recommended_movies.append(movie)
+            if len(recommended_movies) >= limit:
+                break
 
-        return recommended_movies
+    return recommended_movies
+
+
+def get_mood_based_recommendations(mood, available_movies, limit=10):
+    client = _get_client()
+    if not client:
+        return get_fallback_mood_recommendations(mood, available_movies, limit)
+
+    try:
+        diverse_movies = get_diverse_movie_sample(available_movies, sample_size=200)
+        with metrics.span('openai'):
+            response = client.chat.completions.create(**_mood_request(mood, diverse_movies, limit))
+        return _pick_recommendations(response, diverse_movies, limit, with_reason=True)
 
     except Exception as e:
+        metrics.upstream_error('openai')
         logger.error(f"Error getting AI recommendations: {e}")
         return get_fallback_mood_recommendations(mood, available_movies, limit)
 
 
 def get_genre_recommendations(genre, available_movies, limit=10):
-    if not openai_client:
+    client = _get_client()
+    if not client:
         return get_fallback_genre_recommendations(genre, available_movies, limit)
 
     try:
         diverse_movies = get_diverse_movie_sample(available_movies, sample_size=200)
-        movies_data = []
-        for m in diverse_movies[:100]:
-            movies_data.append({
-                'title': m.get('title', ''),
-                'genres': m.get('genres', []),
-                'rating': m.get('vote_average', 0)
-            })
+        with metrics.span('openai'):
+            response = client.chat.completions.create(**_genre_request(genre, diverse_movies, limit))
+        return _pick_recommendations(response, diverse_movies, limit)
 
-        prompt = f"""The user wants to watch movies in the "{genre}" genre.
-        
-Available movies with their genres: {json.dumps(movies_data[:50])}
+    except Exception as e:
+        metrics.upstream_error('openai')
+        logger.error(f"Error getting genre recommendations: {e}")
+        return get_fallback_genre_recommendations(genre, available_movies, limit)
 
-Return a JSON object with this exact format:
-{{"recommendations": ["Movie Title 1", "Movie Title 2", "Movie Title 3", ...], "reason": "Brief explanation of the selection"}}
 
-Select up to {limit} movies that best match the requested genre. Prioritize higher-rated movies. Only include movies from the provided list."""
+async def get_mood_based_recommendations_async(mood, available_movies, limit=10):
+    client = _get_async_client()
+    if not client:
+        return get_fallback_mood_recommendations(mood, available_movies, limit)
 
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a movie recommendation expert. Help users find the best movies in their preferred genres. Always respond with valid JSON."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=1024
-        )
+    try:
+        diverse_movies = get_diverse_movie_sample(available_movies, sample_size=200)
+        with metrics.span('openai'):
+            response = await client.chat.completions.create(
+                **_mood_request(mood, diverse_movies, limit))
+        return _pick_recommendations(response, diverse_movies, limit, with_reason=True)
 
-        result = json.loads(response.choices[0].message.content)
-        recommended_titles = result.get('recommendations', [])
+    except Exception as e:
+        metrics.upstream_error('openai')
+        logger.error(f"Error getting AI recommendations: {e}")
+        return get_fallback_mood_recommendations(mood, available_movies, limit)
 
-        recommended_movies = []
-        for movie in diverse_movies:
-            if movie.get('title') in recommended_titles:
-                recommended_movies.append(movie)
-                if len(recommended_movies) >= limit:
-                    break
 
-        return recommended_movies
+async def get_genre_recommendations_async(genre, available_movies, limit=10):
+    client = _get_async_client()
+    if not client:
+        return get_fallback_genre_recommendations(genre, available_movies, limit)
+
+    try:
+        diverse_movies = get_diverse_movie_sample(available_movies, sample_size=200)
+        with metrics.span('openai'):
+            response = await client.chat.completions.create(
+                **_genre_request(genre, diverse_movies, limit))
+        return _pick_recommendations(response, diverse_movies, limit)
 
     except Exception as e:
+        metrics.upstream_error('openai')
         logger.error(f"Error getting genre recommendations: {e}")
         return get_fallback_genre_recommendations(genre, available_movies, limit)
 
 
 def get_search_recommendations(query, available_movies, limit=10):
-    if not openai_client:
+    client = _get_client()
+    if not client:
         return []
 
     try:
@@ -174,18 +247,19 @@ Return a JSON object with this exact format:
 
 Select up to {limit} movies that are most relevant to the search query. Consider title matches, plot keywords, and thematic similarities. Only include movies from the provided list."""
 
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a movie search expert. Help users find movies based on their search queries. Always respond with valid JSON."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=1024
-        )
+        with metrics.span('openai'):
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a movie search expert. Help users find movies based on their search queries. Always respond with valid JSON."
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                max_tokens=1024
+            )
 
         result = json.loads(response.choices[0].message.content)
         recommended_titles = result.get('recommendations', [])
@@ -200,6 +274,7 @@ Select up to {limit} movies that are most relevant to the search query. Consider
         return recommended_movies
 
     except Exception as e:
+        metrics.upstream_error('openai')
         logger.error(f"Error getting search recommendations: {e}")
         return []
 
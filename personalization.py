@@ -0,0 +1,118 @@
+import base64
+import binascii
+import logging
+import os
+
+from flask import has_request_context, session
+
+logger = logging.getLogger(__name__)
+
+PERSONALIZATION_ENABLED = os.environ.get("PERSONALIZATION_ENABLED", "1") != "0"
+# Each interaction scales the existing profile by PROFILE_DECAY before adding
+# the new item, so recent taste outweighs old visits.
+PROFILE_DECAY = 0.85
+VIEW_WEIGHT = 1.0
+RECOMMEND_WEIGHT = 0.3
+# Share of the final score that comes from profile similarity; the rest keeps
+# the row's original (popularity/rating/LLM) order.
+PERSONALIZATION_WEIGHT = float(os.environ.get("PERSONALIZATION_WEIGHT", 0.5))
+
+
+def _enabled():
+    from app import app
+
+    return PERSONALIZATION_ENABLED and bool(app.secret_key) and has_request_context()
+
+
+def _encode(vector):
+    import numpy as np
+
+    return base64.b64encode(vector.astype(np.float16).tobytes()).decode('ascii')
+
+
+def _decode(data):
+    import numpy as np
+
+    return np.frombuffer(base64.b64decode(data), dtype=np.float16).astype(np.float32)
+
+
+def current_profile():
+    """The visitor's profile vector, or None if they have no usable profile.
+
+    The profile travels in the signed session cookie (as float16, a few
+    hundred bytes), so every worker sees the same one. Profiles built
+    against different item features are discarded.
+    """
+    from movie_data import movie_loader
+
+    if not _enabled() or movie_loader.item_vectors is None:
+        return None
+    stored = session.get('profile')
+    if not stored or stored.get('features') != movie_loader.item_features_digest:
+        return None
+    try:
+        vector = _decode(stored['vector'])
+    except (KeyError, TypeError, ValueError, binascii.Error):
+        return None
+    if len(vector) != movie_loader.item_vectors.shape[1]:
+        return None
+    return vector
+
+
+def has_profile():
+    return current_profile() is not None
+
+
+def _record(movie_ids, weight):
+    from movie_data import movie_loader
+
+    if not _enabled() or movie_loader.item_vectors is None or not movie_ids:
+        return
+
+    rows = movie_loader.item_rows(movie_ids)
+    rows = rows[rows >= 0]
+    if not len(rows):
+        return
+
+    item = movie_loader.item_vectors[rows].mean(axis=0)
+    vector = current_profile()
+    vector = item * weight if vector is None else vector * PROFILE_DECAY + item * weight
+    session['profile'] = {'vector': _encode(vector), 'features': movie_loader.item_features_digest}
+    session.permanent = True
+
+
+def record_view(movie_id):
+    try:
+        _record([movie_id], VIEW_WEIGHT)
+    except Exception as e:
+        logger.error(f"Error updating profile: {e}")
+
+
+def record_recommendations(movies):
+    try:
+        _record([m.get('id') for m in movies], RECOMMEND_WEIGHT)
+    except Exception as e:
+        logger.error(f"Error updating profile: {e}")
+
+
+def rerank(movies, profile):
+    """Reorder ``movies`` by blending their position with their cosine
+    similarity to ``profile``; returns them unchanged without a profile."""
+    import numpy as np
+
+    from movie_data import movie_loader
+
+    if profile is None or len(movies) < 2 or movie_loader.item_vectors is None:
+        return movies
+    norm = float(np.linalg.norm(profile))
+    if norm == 0:
+        return movies
+
+    rows = movie_loader.item_rows([m.get('id') for m in movies])
+    known = rows >= 0
+    similarity = np.zeros(len(movies), dtype=np.float32)
+    similarity[known] = movie_loader.item_vectors[rows[known]] @ (profile / norm)
+    prior = 1.0 - np.arange(len(movies)) / len(movies)
+    scores = PERSONALIZATION_WEIGHT * similarity + (1 - PERSONALIZATION_WEIGHT) * prior
+    return [movies[i] for i in np.argsort(-scores, kind='stable')]
+
@@ -0,0 +1,200 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from PIL import Image
+
+import metrics
+from response_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+POSTER_CACHE_DIR = os.path.abspath(os.environ.get("POSTER_CACHE_DIR", "poster_cache"))
+POSTER_MAX_AGE = 7 * 24 * 3600
+POSTER_SIZES = {
+    'card': (300, 450),
+    'hero': (780, 1170),
+}
+MISSING_RETRY_SECONDS = 15 * 60
+MISSING_MAX_ENTRIES = int(os.environ.get("POSTER_MISSING_MAX_ENTRIES", 10000))
+
+_IMDB_ID_RE = re.compile(r'^tt\d{7,10}$')
+
+# imdb_id -> (lock, number of threads holding or waiting on it)
+_locks = {}
+_locks_guard = threading.Lock()
+_missing = LRUCache(MISSING_MAX_ENTRIES)
+
+
+def _default_fetcher(imdb_id):
+    from omdb_api import get_poster_url, PRIORITY_BELOW_FOLD
+
+    # The page that linked this poster already looked it up at its own
+    # priority; a miss here must not eat into the budget for visible cards.
+    url = get_poster_url(imdb_id=imdb_id, priority=PRIORITY_BELOW_FOLD)
+    if not url:
+        return None
+
+    with metrics.span('poster_upstream'):
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+    return response.content, response.headers.get('Content-Type', 'image/jpeg')
+
+
+_upstream_fetcher = _default_fetcher
+
+
+def set_upstream_fetcher(fetcher):
+    """Replace the upstream used on a cache miss.
+
+    ``fetcher(imdb_id)`` must return ``(image_bytes, content_type)`` or None
+    when the movie has no poster. Passing None restores the OMDb fetcher.
+    """
+    global _upstream_fetcher
+    _upstream_fetcher = fetcher or _default_fetcher
+
+
+def is_valid_imdb_id(imdb_id):
+    return bool(imdb_id and _IMDB_ID_RE.match(imdb_id))
+
+
+def _object_path(digest):
+    return os.path.join(POSTER_CACHE_DIR, 'objects', digest[:2], digest)
+
+
+def _index_path(imdb_id):
+    return os.path.join(POSTER_CACHE_DIR, 'index', f"{imdb_id}.json")
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _store_object(data):
+    digest = hashlib.sha256(data).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        _atomic_write(path, data)
+    return digest
+
+
+def _resize(data, box):
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width <= box[0] and img.height <= box[1]:
+                return None
+            img = img.convert('RGB')
+            img.thumbnail(box, Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format='JPEG', quality=85, optimize=True, progressive=True)
+            return out.getvalue()
+    except Exception as e:
+        logger.debug(f"Could not resize poster: {e}")
+        return None
+
+
+def _read_index(imdb_id):
+    try:
+        with open(_index_path(imdb_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _build_entry(imdb_id):
+    fetched = _upstream_fetcher(imdb_id)
+    if not fetched:
+        return None
+
+    data, content_type = fetched
+    original = _store_object(data)
+    index = {
+        'imdb_id': imdb_id,
+        'variants': {'original': {'digest': original, 'mimetype': content_type}},
+        'fetched_at': int(time.time())
+    }
+
+    for size, box in POSTER_SIZES.items():
+        resized = _resize(data, box)
+        if resized is None:
+            index['variants'][size] = index['variants']['original']
+        else:
+            index['variants'][size] = {'digest': _store_object(resized), 'mimetype': 'image/jpeg'}
+
+    _atomic_write(_index_path(imdb_id), json.dumps(index).encode('utf-8'))
+    logger.debug(f"Cached poster for {imdb_id}")
+    return index
+
+
+@contextmanager
+def _locked(imdb_id):
+    with _locks_guard:
+        lock, users = _locks.get(imdb_id) or (threading.Lock(), 0)
+        _locks[imdb_id] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _locks_guard:
+            users = _locks[imdb_id][1] - 1
+            if users:
+                _locks[imdb_id] = (lock, users)
+            else:
+                del _locks[imdb_id]
+
+
+def get_cached_poster(imdb_id, size='card'):
+    """Return ``{'path', 'etag', 'mimetype'}`` for a poster variant, fetching
+    and caching it on first use, or None when no poster is available."""
+    if not is_valid_imdb_id(imdb_id):
+        return None
+    if size != 'original' and size not in POSTER_SIZES:
+        return None
+
+    index = _read_index(imdb_id)
+    metrics.cache_lookup('poster_disk', hit=index is not None)
+    if index is None:
+        missing_since = _missing.get(imdb_id)
+        if missing_since and time.time() - missing_since < MISSING_RETRY_SECONDS:
+            return None
+
+        with _locked(imdb_id):
+            index = _read_index(imdb_id)
+            if index is None:
+                try:
+                    index = _build_entry(imdb_id)
+                except Exception as e:
+                    metrics.upstream_error('poster')
+                    logger.error(f"Error fetching poster for {imdb_id}: {e}")
+                    index = None
+                if index is None:
+                    _missing.set(imdb_id, time.time())
+                    return None
+                _missing.pop(imdb_id)
+
+    variant = index['variants'].get(size)
+    if not variant:
+        return None
+
+    path = _object_path(variant['digest'])
+    if not os.path.exists(path):
+        return None
+
+    return {'path': path, 'etag': variant['digest'], 'mimetype': variant['mimetype']}
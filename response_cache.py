@@ -0,0 +1,188 @@
+import copy
+import functools
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, make_response, request
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 512))
+
+
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_pages = LRUCache(RESPONSE_CACHE_MAX_ENTRIES)
+_fragments = LRUCache(RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def catalog_version():
+    from movie_data import movie_loader
+
+    return movie_loader.version
+
+
+def add_dependencies(keys):
+    """Record OMDb cache keys the current response was built from."""
+    if has_request_context():
+        g.setdefault('cache_dependencies', set()).update(keys)
+
+
+def add_throttled(keys):
+    """Record OMDb lookups the scheduler refused for the current response;
+    fragments and pages depending on them are not cached."""
+    if has_request_context():
+        g.setdefault('throttled_lookups', set()).update(keys)
+
+
+def throttled_lookups():
+    return g.get('throttled_lookups', set()) if has_request_context() else set()
+
+
+def _dependency_versions(keys):
+    from omdb_api import cache_versions
+
+    return cache_versions(keys)
+
+
+def _is_current(entry):
+    return not entry['deps'] or _dependency_versions(entry['deps']) == entry['deps']
+
+
+def get_fragment(name):
+    """Return a deep copy of the cached fragment ``name``, or None when it is
+    missing or any OMDb entry it was built from has changed since, so
+    callers can decorate rows freely."""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    entry = _fragments.get((name, catalog_version()))
+    if entry is None or not _is_current(entry):
+        return None
+    # The page embedding this fragment depends on the same entries.
+    add_dependencies(entry['deps'])
+    return copy.deepcopy(entry['value'])
+
+
+def set_fragment(name, value, dependencies=()):
+    """Cache ``value`` as fragment ``name``; ``dependencies`` are the OMDb
+    cache keys its rows were decorated from."""
+    if not RESPONSE_CACHE_ENABLED:
+        return
+    if has_request_context() and g.get('skip_response_cache'):
+        logger.debug(f"Not caching fragment {name}: response marked incomplete")
+        return
+    if not throttled_lookups().isdisjoint(dependencies):
+        logger.debug(f"Not caching fragment {name}: built from throttled OMDb lookups")
+        return
+    _fragments.set((name, catalog_version()),
+                   {'value': copy.deepcopy(value), 'deps': _dependency_versions(dependencies)})
+
+
+def cached_fragment(name, builder):
+    """Return the result of ``builder()``, cached for the current catalog."""
+    value = get_fragment(name)
+    if value is None:
+        value = builder()
+        set_fragment(name, value)
+    return value
+
+
+def skip_response_cache():
+    """Mark the current response as not cacheable (e.g. an error fallback);
+    neither the page nor its fragments are stored."""
+    g.skip_response_cache = True
+
+
+def cached_page(view=None, bypass=None):
+    """Cache a view's rendered body per URL and catalog version and answer
+    conditional requests with 304 Not Modified. A page is re-rendered once
+    any OMDb entry it was built from changes, goes stale or expires.
+
+    With ``@cached_page(bypass=fn)`` the page is rendered fresh whenever
+    ``fn()`` is true for the current request (fragments are still cached).
+    """
+    if view is None:
+        return functools.partial(cached_page, bypass=bypass)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not RESPONSE_CACHE_ENABLED or request.method != 'GET':
+            return view(*args, **kwargs)
+        if bypass is not None and bypass():
+            return view(*args, **kwargs)
+
+        key = (request.full_path, catalog_version())
+        entry = _pages.get(key)
+
+        if entry is None or not _is_current(entry):
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or g.get('skip_response_cache'):
+                return response
+            dependencies = g.get('cache_dependencies', set())
+            if not throttled_lookups().isdisjoint(dependencies):
+                return response
+
+            body = response.get_data()
+            entry = {
+                'body': body,
+                'mimetype': response.mimetype,
+                'etag': hashlib.sha1(str(key[1]).encode('utf-8') + body).hexdigest(),
+                'last_modified': datetime.now(timezone.utc).replace(microsecond=0),
+                'deps': _dependency_versions(g.get('cache_dependencies', ()))
+            }
+            _pages.set(key, entry)
+            logger.debug(f"Cached page {request.full_path} depending on {len(entry['deps'])} OMDb entries")
+
+        response = make_response(entry['body'])
+        response.mimetype = entry['mimetype']
+        response.set_etag(entry['etag'])
+        response.last_modified = entry['last_modified']
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    return wrapper
+
+
+def clear():
+    _pages.clear()
+    _fragments.clear()
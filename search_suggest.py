@@ -0,0 +1,252 @@
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_REFRESH_SECONDS = int(os.environ.get("SUGGEST_REFRESH_SECONDS", 300))
+SUGGEST_HISTORY_LIMIT = 50000
+# How much a title's search frequency counts relative to its popularity
+# rank (both end up on a 0..1-ish scale).
+FREQUENCY_WEIGHT = 0.5
+_ARTICLES = ('the ', 'a ', 'an ')
+# A logged query that is only a prefix is credited to a title when it
+# narrows the index down to that one title within this many keys.
+_RESOLVE_MAX_KEYS = 20
+_MEMO_SIZE = 2048
+
+
+def _normalize(query):
+    return ' '.join(query.lower().split())[:500]
+
+
+class SuggestionIndex:
+    """Sorted prefix index over catalog titles with precomputed weights.
+
+    A prefix maps to a contiguous slice of the sorted keys, found with two
+    bisects; the best-weighted entries of that slice are picked with
+    argpartition and memoized until the next rebuild.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.rows = None
+        self.weights = None
+        self.titles = []
+        self.ids = []
+        self.imdb_ids = []
+        self.catalog_version = None
+        self._memo = {}
+
+    @classmethod
+    def build(cls, movies_df, catalog_version, frequencies):
+        import numpy as np
+
+        index = cls()
+        index.catalog_version = catalog_version
+        if movies_df is None or movies_df.empty:
+            return index
+
+        titles = movies_df['title'].fillna('').astype(str).tolist()
+        popularity = movies_df['popularity'].rank(pct=True).fillna(0).to_numpy(dtype=float)
+        base = popularity + np.array([
+            FREQUENCY_WEIGHT * math.log1p(frequencies.get(title.lower(), 0)) for title in titles
+        ])
+
+        entries = []
+        for row, title in enumerate(titles):
+            key = _normalize(title)
+            if not key:
+                continue
+            entries.append((key, row))
+            for article in _ARTICLES:
+                if key.startswith(article) and len(key) > len(article):
+                    entries.append((key[len(article):], row))
+        entries.sort()
+
+        index.keys = [key for key, _ in entries]
+        index.rows = np.array([row for _, row in entries], dtype=np.int64)
+        index.weights = base[index.rows] if len(entries) else np.array([], dtype=float)
+        index.titles = titles
+        index.ids = movies_df['id'].tolist()
+        index.imdb_ids = movies_df['imdb_id'].tolist() if 'imdb_id' in movies_df else [None] * len(titles)
+        return index
+
+    def resolve(self, query):
+        """Lower-cased catalog title a logged search refers to, or None.
+
+        Live search logs what was typed so far, so besides exact titles this
+        accepts a prefix that matches a single title.
+        """
+        query = _normalize(query)
+        if not query:
+            return None
+
+        lo = bisect.bisect_left(self.keys, query)
+        if lo < len(self.keys) and self.keys[lo] == query:
+            return self.titles[int(self.rows[lo])].lower()
+        hi = bisect.bisect_left(self.keys, query + '\uffff', lo, min(lo + _RESOLVE_MAX_KEYS + 1, len(self.keys)))
+        if hi == lo or hi - lo > _RESOLVE_MAX_KEYS:
+            return None
+        titles = {self.titles[int(row)].lower() for row in self.rows[lo:hi]}
+        return titles.pop() if len(titles) == 1 else None
+
+    def suggest(self, prefix, limit=8):
+        prefix = _normalize(prefix)
+        if not prefix or limit < 1:
+            return []
+
+        memo_key = (prefix, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        import numpy as np
+
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        suggestions = []
+        if hi > lo:
+            weights = self.weights[lo:hi]
+            # Over-fetch so that titles matched twice (with and without a
+            # leading article) still leave `limit` distinct rows.
+            k = min(len(weights), limit * 2)
+            top = np.argpartition(-weights, k - 1)[:k] if k < len(weights) else np.arange(len(weights))
+            top = top[np.argsort(-weights[top], kind='stable')]
+            seen = set()
+            for position in top:
+                row = int(self.rows[lo + position])
+                if row in seen:
+                    continue
+                seen.add(row)
+                suggestions.append({
+                    'id': self.ids[row],
+                    'title': self.titles[row],
+                    'imdb_id': self.imdb_ids[row]
+                })
+                if len(suggestions) >= limit:
+                    break
+
+        if len(self._memo) >= _MEMO_SIZE:
+            self._memo.clear()
+        self._memo[memo_key] = suggestions
+        return suggestions
+
+
+_index = SuggestionIndex()
+_frequencies = {}
+_frequencies_loaded_at = 0.0
+_refresh_lock = threading.Lock()
+_refreshing = False
+
+
+def _load_frequencies():
+    from app import app, db
+    from models import SearchHistory
+
+    normalized = db.func.lower(SearchHistory.query)
+    with app.app_context():
+        rows = (db.session.query(normalized, db.func.count())
+                .group_by(normalized)
+                .order_by(db.func.count().desc())
+                .limit(SUGGEST_HISTORY_LIMIT)
+                .all())
+    return {query: count for query, count in rows}
+
+
+def _title_frequencies(queries, index):
+    frequencies = {}
+    for query, count in queries.items():
+        title = index.resolve(query)
+        if title:
+            frequencies[title] = frequencies.get(title, 0) + count
+    return frequencies
+
+
+def _refresh_frequencies():
+    global _frequencies, _frequencies_loaded_at, _index, _refreshing
+
+    try:
+        from movie_data import movie_loader
+
+        queries = _load_frequencies()
+        index = _index
+        if index.catalog_version != movie_loader.version:
+            index = SuggestionIndex.build(movie_loader.movies_df, movie_loader.version, {})
+        _frequencies = _title_frequencies(queries, index)
+        _frequencies_loaded_at = time.monotonic()
+        _index = SuggestionIndex.build(movie_loader.movies_df, movie_loader.version, _frequencies)
+        logger.debug(f"Refreshed search frequencies ({len(queries)} queries, {len(_frequencies)} titles)")
+    except Exception as e:
+        _frequencies_loaded_at = time.monotonic()
+        logger.debug(f"Could not refresh search frequencies: {e}")
+    finally:
+        _refreshing = False
+
+
+def _maybe_refresh():
+    global _refreshing
+
+    if time.monotonic() - _frequencies_loaded_at < SUGGEST_REFRESH_SECONDS:
+        return
+    with _refresh_lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_refresh_frequencies, name='suggest-refresh', daemon=True).start()
+
+
+def build_index():
+    global _index
+
+    from movie_data import movie_loader
+
+    movie_loader.load_data()
+    with _refresh_lock:
+        if _index.catalog_version != movie_loader.version:
+            _index = SuggestionIndex.build(movie_loader.movies_df, movie_loader.version, _frequencies)
+    return _index
+
+
+def suggest(prefix, limit=8):
+    from movie_data import movie_loader
+
+    index = _index
+    if index.catalog_version != movie_loader.version:
+        index = build_index()
+    _maybe_refresh()
+    return index.suggest(prefix, limit=limit)
+
+
+def _flush_search_history(rows):
+    from app import app, db
+    from models import SearchHistory
+
+    with app.app_context():
+        try:
+            db.session.execute(db.insert(SearchHistory), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+_history_writer = WriteBehindQueue(
+    'search-history',
+    _flush_search_history,
+    batch_size=200,
+    flush_interval_ms=1000,
+    max_size=10000
+)
+
+
+def record_search(query):
+    query = _normalize(query)
+    if query:
+        _history_writer.put({'query': query, 'created_at': datetime.utcnow()})
@@ -0,0 +1,113 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from movie_data import MovieDataLoader
+
+
+def _genres(*names):
+    ids = {'Action': 28, 'Comedy': 35, 'Drama': 18}
+    return json.dumps([{'id': ids[name], 'name': name} for name in names])
+
+
+def _keywords(*names):
+    return json.dumps([{'id': i, 'name': name} for i, name in enumerate(names)])
+
+
+@pytest.fixture
+def loader():
+    movies = pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6],
+        'title': ['Alpha', 'Bravo', 'Charlie', 'Delta', 'Echo', 'Foxtrot'],
+        'overview': [''] * 6,
+        'genres': [_genres('Action'), _genres('Action', 'Comedy'), _genres('Comedy'),
+                   _genres('Drama'), _genres('Action', 'Drama'), _genres('Comedy', 'Drama')],
+        'keywords': [_keywords('heist'), _keywords('space heist'), '[]',
+                     _keywords('space'), '[]', _keywords('heist')],
+        'release_date': ['1985-01-01', '1999-06-01', '2005-03-01', None, '2010-09-01', '2012-01-01'],
+        'runtime': [100, 120, 90, 150, np.nan, 110],
+        'vote_average': [7.5, np.nan, 6.1, 8.2, 5.0, 7.9],
+        'vote_count': [100, 20, 300, 50, 5, 1000],
+        'popularity': [10.0, 50.0, np.nan, 30.0, 20.0, 40.0],
+    })
+    credits = pd.DataFrame({
+        'movie_id': [1, 2, 3],
+        'cast': [json.dumps([{'cast_id': 0, 'name': 'Ann Lee', 'order': 0}]),
+                 json.dumps([{'cast_id': 0, 'name': 'Bo Lee', 'order': 0}]),
+                 json.dumps([{'cast_id': 0, 'name': 'Cy Ode', 'order': 0}])],
+    })
+    loader = MovieDataLoader()
+    loader.load_frames(movies, credits_df=credits)
+    return loader
+
+
+def _ids(result):
+    return [movie['id'] for movie in result['movies']]
+
+
+def test_filters_combine(loader):
+    result = loader.discover(genres=['action'], year_min=1990, sort='year', descending=False)
+    assert _ids(result) == [2, 5]
+    assert result['total'] == 2
+
+    result = loader.discover(genres=['Action', 'Comedy'])
+    assert _ids(result) == [2]
+
+    result = loader.discover(genres=['comedy'], keyword='heist', rating_min=7)
+    assert _ids(result) == [6]
+
+    result = loader.discover(cast='lee', runtime_max=110)
+    assert _ids(result) == [1]
+
+
+def test_missing_values_drop_out_of_filtered_columns(loader):
+    # Delta has no release date and Echo no runtime.
+    assert 4 not in _ids(loader.discover(year_max=2020, limit=10))
+    assert 5 not in _ids(loader.discover(runtime_min=0, limit=10))
+    assert loader.discover(limit=10)['total'] == 6
+
+
+def test_unknown_genre_or_term_matches_nothing(loader):
+    assert loader.discover(genres=['Western'])['total'] == 0
+    assert loader.discover(genres=['Action', 'Western'])['total'] == 0
+    assert loader.discover(keyword='nothing like it')['total'] == 0
+    assert loader.discover(cast='nobody')['total'] == 0
+
+
+def test_facet_counts_follow_the_filter(loader):
+    facets = loader.discover(year_min=1990, limit=1)['facets']
+    assert facets['genres'] == {'Action': 2, 'Comedy': 3, 'Drama': 2}
+    assert facets['decades'] == {'1990s': 1, '2000s': 1, '2010s': 2}
+    # Bravo has no rating, so only three of the four rows are bucketed.
+    assert facets['ratings'] == {'5': 1, '6': 1, '7': 1}
+
+    facets = loader.discover(genres=['drama'])['facets']
+    assert facets['genres'] == {'Action': 1, 'Comedy': 1, 'Drama': 3}
+    assert facets['decades'] == {'2010s': 2}
+
+
+@pytest.mark.parametrize('descending, expected', [
+    (True, [2, 6, 4, 5, 1, 3]),
+    (False, [1, 5, 4, 6, 2, 3]),
+])
+def test_missing_values_sort_last(loader, descending, expected):
+    assert _ids(loader.discover(sort='popularity', descending=descending, limit=10)) == expected
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_pages_match_the_full_order(loader, descending):
+    full = _ids(loader.discover(sort='vote_average', descending=descending, limit=10))
+    assert full[-1] == 2
+    pages = []
+    for offset in range(0, 6, 2):
+        pages += _ids(loader.discover(sort='vote_average', descending=descending, limit=2, offset=offset))
+    assert pages == full
+    assert _ids(loader.discover(sort='vote_average', descending=descending, limit=3, offset=4)) == full[4:]
+    assert loader.discover(limit=5, offset=6)['movies'] == []
+    assert loader.discover(limit=0)['movies'] == []
+
+
+def test_unknown_sort_falls_back_to_popularity(loader):
+    assert _ids(loader.discover(sort='budget', limit=3)) == [2, 6, 4]
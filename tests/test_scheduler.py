@@ -0,0 +1,70 @@
+import pytest
+
+import omdb_api
+from omdb_api import (OutboundScheduler, PRIORITY_BELOW_FOLD, PRIORITY_HERO, PRIORITY_PREWARM,
+                      PRIORITY_VISIBLE)
+
+
+class _Writer:
+    def __init__(self):
+        self.rows = []
+
+    def put(self, row):
+        self.rows.append(row)
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = _Writer()
+    monkeypatch.setattr(omdb_api, '_quota_writer', writer)
+    monkeypatch.setattr(omdb_api, '_load_quota_usage', lambda day: 0)
+    return writer
+
+
+def _drain(scheduler, priority):
+    granted = 0
+    while scheduler.try_acquire(priority) == 0:
+        granted += 1
+    return granted
+
+
+def test_burst_keeps_reserve_for_higher_priorities(writer):
+    scheduler = OutboundScheduler(rate=0, burst=10, daily_quota=1000)
+    # Prefetch may only use the half of the bucket above its reserve.
+    assert _drain(scheduler, PRIORITY_PREWARM) == 5
+    assert _drain(scheduler, PRIORITY_BELOW_FOLD) == 2
+    assert _drain(scheduler, PRIORITY_VISIBLE) == 2
+    assert _drain(scheduler, PRIORITY_HERO) == 1
+    assert len(writer.rows) == 10
+    assert scheduler.stats['granted'] == 10
+
+
+def test_wait_reported_when_bucket_is_empty(writer):
+    scheduler = OutboundScheduler(rate=2, burst=1, daily_quota=1000)
+    assert scheduler.try_acquire(PRIORITY_HERO) == 0
+    assert scheduler.try_acquire(PRIORITY_HERO) == pytest.approx(0.5, abs=0.05)
+    assert not scheduler.acquire(PRIORITY_BELOW_FOLD)
+    assert scheduler.stats['rate_limited'] == 1
+
+
+def test_daily_quota_reserve(writer):
+    scheduler = OutboundScheduler(rate=0, burst=1000, daily_quota=10)
+    assert _drain(scheduler, PRIORITY_PREWARM) == 5
+    assert scheduler.try_acquire(PRIORITY_PREWARM) is None
+    assert _drain(scheduler, PRIORITY_HERO) == 5
+    assert scheduler.remaining() == 0
+    assert scheduler.try_acquire(PRIORITY_HERO) is None
+    assert not scheduler.acquire(PRIORITY_HERO)
+    # Every refusal above counts, including the one that ended each drain.
+    assert scheduler.stats['quota_exhausted'] == 5
+    assert scheduler.stats['rate_limited'] == 0
+
+
+def test_usage_flushed_picks_up_other_workers(writer):
+    scheduler = OutboundScheduler(rate=0, burst=100, daily_quota=100)
+    for _ in range(3):
+        scheduler.try_acquire(PRIORITY_HERO)
+    day = writer.rows[0]['day']
+    # Two of our calls were flushed and the table now holds another worker's 40.
+    scheduler.usage_flushed(day, 2, 42)
+    assert scheduler.remaining() == 100 - 43
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from search_suggest import SuggestionIndex
+
+
+@pytest.fixture
+def index():
+    movies = pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'title': ['The Matrix', 'Matrimony', 'Mad Max', 'The Matrix'],
+        'popularity': [90.0, 10.0, 50.0, 5.0],
+        'imdb_id': ['tt0133093', None, 'tt0079501', None],
+    })
+    return SuggestionIndex.build(movies, catalog_version=1, frequencies={'matrimony': 1000})
+
+
+def _ids(suggestions):
+    return [s['id'] for s in suggestions]
+
+
+def test_prefix_matches_ignore_leading_article(index):
+    assert set(_ids(index.suggest('matr'))) == {1, 2, 4}
+    assert _ids(index.suggest('the ma')) == [1, 4]
+    assert index.suggest('zzz') == []
+
+
+def test_suggestions_ordered_by_weight(index):
+    # Search frequency lifts Matrimony above the more popular Matrix.
+    assert _ids(index.suggest('  MAT ', limit=3)) == [2, 1, 4]
+    assert _ids(index.suggest('ma', limit=2)) == [2, 1]
+
+
+def test_each_row_suggested_once(index):
+    # "The Matrix" is indexed under both "the matrix" and "matrix".
+    assert _ids(index.suggest('m', limit=10)) == [2, 1, 3, 4]
+
+
+def test_non_positive_limit(index):
+    assert index.suggest('ma', limit=0) == []
+    assert index.suggest('ma', limit=-3) == []
+    assert index.suggest('', limit=5) == []
+
+
+def test_resolve(index):
+    assert index.resolve('Mad Max') == 'mad max'
+    assert index.resolve('mad') == 'mad max'
+    assert index.resolve('the matrix') == 'the matrix'
+    # "mat" is a prefix of two different titles.
+    assert index.resolve('mat') is None
+    assert index.resolve('') is None
+
+
+def test_empty_catalog():
+    index = SuggestionIndex.build(pd.DataFrame(), catalog_version=1, frequencies={})
+    assert index.suggest('a') == []
+    assert index.resolve('a') is None
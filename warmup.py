@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+WARMUP_RETRY_SECONDS = float(os.environ.get("WARMUP_RETRY_SECONDS", 30))
+
+_status = {'state': 'cold', 'pid': None, 'attempts': 0, 'started_at': None, 'finished_at': None,
+           'steps': {}, 'errors': {}}
+_lock = threading.Lock()
+_done = set()
+_retry_timer = None
+
+
+def _check_database():
+    from app import app, db
+
+    with app.app_context():
+        db.session.execute(db.text('SELECT 1'))
+        db.session.remove()
+
+
+def _load_catalog():
+    from movie_data import movie_loader
+
+    movie_loader.load_data()
+
+
+def _build_suggestions():
+    import search_suggest
+
+    search_suggest.build_index()
+
+
+def _load_quota():
+    import omdb_api
+
+    omdb_api.quota_remaining()
+
+
+def _init_upstreams():
+    import async_runtime
+    import openai_service
+
+    openai_service.init_clients()
+    async_runtime.get_loop()
+
+
+WARMUP_STEPS = (
+    ('database', _check_database),
+    ('catalog', _load_catalog),
+    ('suggestions', _build_suggestions),
+    ('omdb_quota', _load_quota),
+    ('upstreams', _init_upstreams),
+)
+
+
+def _schedule_retry():
+    global _retry_timer
+
+    if WARMUP_RETRY_SECONDS <= 0:
+        return
+    if _retry_timer is not None:
+        _retry_timer.cancel()
+    _retry_timer = threading.Timer(WARMUP_RETRY_SECONDS, warmup)
+    _retry_timer.daemon = True
+    _retry_timer.start()
+    logger.info(f"Retrying failed warm-up steps in {WARMUP_RETRY_SECONDS:.0f}s")
+
+
+def warmup():
+    """Load everything the first request would otherwise pay for.
+
+    Meant to be called from gunicorn's ``post_fork`` hook, before the worker
+    accepts connections. A failed step is logged and the remaining steps
+    still run; the failed ones are retried every ``WARMUP_RETRY_SECONDS``
+    until they pass. Until then the worker is not ready and requests fall
+    back to loading lazily.
+    """
+    with _lock:
+        if _status['pid'] != os.getpid():
+            # Forked from a warmed-up parent: nothing it set up carries over.
+            _done.clear()
+            _status.update(attempts=0, steps={})
+        elif _status['state'] == 'ready':
+            return True
+
+        _status.update(state='warming', pid=os.getpid(), attempts=_status['attempts'] + 1,
+                       started_at=time.time(), finished_at=None, errors={})
+        for name, step in WARMUP_STEPS:
+            if name in _done:
+                continue
+            started = time.perf_counter()
+            try:
+                step()
+                _done.add(name)
+            except Exception as e:
+                _status['errors'][name] = str(e)
+                logger.error(f"Warm-up step {name} failed: {e}")
+            finally:
+                _status['steps'][name] = round((time.perf_counter() - started) * 1000, 1)
+
+        _status['finished_at'] = time.time()
+        if _status['errors']:
+            _status['state'] = 'failed'
+            _schedule_retry()
+            return False
+
+        _status['state'] = 'ready'
+        logger.info(f"Warm-up finished in {sum(_status['steps'].values()):.0f}ms: {_status['steps']}")
+        return True
+
+
+def is_ready():
+    # A worker forked after warm-up inherits the status but not the threads
+    # and connections it set up, so it has to warm up itself.
+    return _status['state'] == 'ready' and _status['pid'] == os.getpid()
+
+
+def status():
+    return dict(_status, ready=is_ready(), steps=dict(_status['steps']), errors=dict(_status['errors']))
+
+
+metrics.register_gauge('cinemood_ready', lambda: 1 if is_ready() else 0)
@@ -0,0 +1,134 @@
+import atexit
+import functools
+import logging
+import os
+import queue
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_queues = []
+
+
+class WriteBehindQueue:
+    """Buffers items in memory and hands them to ``flush_fn`` in batches.
+
+    A background thread flushes whenever ``batch_size`` items are pending or
+    ``flush_interval_ms`` has passed since the first pending item. The queue
+    is bounded; items put while it is full are dropped and counted.
+    """
+
+    def __init__(self, name, flush_fn, batch_size=50, flush_interval_ms=500, max_size=5000):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_size = max_size
+        self.stats = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        atexit.register(self.shutdown)
+        _queues.append(self)
+        metrics.register_gauge('cinemood_write_behind_pending', self.pending, queue=name)
+        for stat in self.stats:
+            metrics.register_gauge(f"cinemood_write_behind_{stat}", functools.partial(self.stats.get, stat),
+                                   queue=name)
+
+    def _ensure_started(self):
+        # Threads do not survive a fork, so a worker forked from a preloaded
+        # master starts its own flusher on first use.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}",
+                                            daemon=True)
+            self._thread.start()
+
+    def put(self, item):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+            self.stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            logger.warning(f"Write-behind queue {self.name} full, dropped item "
+                           f"({self.stats['dropped']} dropped so far)")
+            return False
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _take_batch(self):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            self.flush_fn(batch)
+            self.stats['flushed'] += len(batch)
+            self.stats['batches'] += 1
+        except Exception as e:
+            self.stats['failed'] += len(batch)
+            logger.error(f"Write-behind flush for {self.name} failed ({len(batch)} items): {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush(self._take_batch())
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+
+    def flush(self):
+        if self._queue is not None and self._pid == os.getpid():
+            self._drain()
+
+    def shutdown(self, timeout=5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._drain()
+        self._thread = None
+
+
+def shutdown_all(timeout=5.0):
+    """Flush and stop every queue, e.g. before the database they write to goes away."""
+    for writer in _queues:
+        writer.shutdown(timeout=timeout)